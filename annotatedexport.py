@@ -0,0 +1,198 @@
+import argparse
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from posecommon import JOINT_SETS, POSE_CONNECTIONS, joint_angles
+
+# Annotated video export.
+#
+# BackgroundVideoWriter hands frames to cv2.VideoWriter on its own thread
+# through a bounded queue, so encoding overlaps with capture and inference
+# instead of running inline. By default a full queue blocks the producer,
+# which loses no frames. With drop_when_full=True the newest frame is dropped
+# instead, so a slow encoder can never stall a live camera loop. Frames must
+# not be modified after write().
+#
+# render_overlay draws what the capture scripts draw (angle arcs and text, with
+# the skeleton on top) from a (33, 4) pixel landmark array, so overlays can also be
+# rendered later from stored landmarks without re-running inference:
+#
+#   python annotatedexport.py kannadu.mp4 --landmarks pose_data.json --out kannadu_annotated.mp4
+#   python annotatedexport.py kannadu.mp4 --cache-dir landmark_cache --out kannadu_annotated.mp4
+#
+# Landmarks are matched to video frames by timestamp, so JSON from the live
+# scripts, landmark cache entries and gap-filled .npz files all work.
+
+VISIBILITY_THRESHOLD = 0.5  # what mp_drawing.draw_landmarks skips below
+LANDMARK_COLOR = (0, 0, 255)
+CONNECTION_COLOR = (224, 224, 224)
+
+
+class BackgroundVideoWriter:
+    def __init__(self, path, fps, frame_size, fourcc="mp4v", queue_size=64, drop_when_full=False):
+        self.path = path
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, frame_size)
+        if not self.writer.isOpened():
+            raise RuntimeError(f"Could not open {path} for writing.")
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.drop_when_full = drop_when_full
+        self.written = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.encode_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="video-encoder", daemon=True)
+        self._thread.start()
+
+    def write(self, frame):
+        if self.drop_when_full:
+            try:
+                self.frames.put_nowait(frame)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            self.frames.put(frame)
+        self.max_depth = max(self.max_depth, self.frames.qsize())
+
+    def _run(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                break
+            started = time.perf_counter()
+            self.writer.write(frame)
+            self.encode_seconds += time.perf_counter() - started
+            self.written += 1
+
+    def close(self):
+        self.frames.put(None)
+        self._thread.join()
+        self.writer.release()
+        return self.stats()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "written": self.written,
+            "dropped": self.dropped,
+            "max_queue_depth": self.max_depth,
+            "encode_ms_per_frame": round(1000 * self.encode_seconds / self.written, 3) if self.written else None,
+        }
+
+
+def render_overlay(frame, landmarks, angles=None, joint_sets=JOINT_SETS):
+    # Angle arcs / text, then the skeleton, for one (33, >=2) pixel landmark array, in place.
+    # As in the live loops angles ignore visibility; only the skeleton skips low-visibility points
+    if landmarks is None or np.isnan(landmarks[:, 0]).all():
+        return frame
+    landmarks = np.asarray(landmarks)
+    detected = ~np.isnan(landmarks[:, 0])
+    points = np.nan_to_num(landmarks[:, :2]).astype(np.int64)
+
+    if angles is None:
+        angles = joint_angles(points, joint_sets)
+    idx = np.array(list(joint_sets.values()))
+    # calculate_angle returns an int 0 when a vector has zero length, so the text reads 0°
+    degenerate = ((points[idx[:, 0]] == points[idx[:, 1]]).all(-1)
+                  | (points[idx[:, 2]] == points[idx[:, 1]]).all(-1)).tolist()
+    pts = points.tolist()
+    for (a, b, c), angle, zero in zip(joint_sets.values(), np.asarray(angles).tolist(), degenerate):
+        if angle != angle or not (detected[a] and detected[b] and detected[c]):
+            continue
+        if zero:
+            angle = 0
+        bx, by = pts[b]
+        cv2.putText(frame, f"{angle}°", (bx + 10, by - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        cv2.ellipse(frame, (bx, by), (20, 20), 0, 0, angle, (255, 0, 255), 2)
+
+    visible = detected.copy()
+    if landmarks.shape[1] > 3:
+        visible &= ~(landmarks[:, 3] < VISIBILITY_THRESHOLD)
+    for a, b in POSE_CONNECTIONS:
+        if visible[a] and visible[b]:
+            cv2.line(frame, tuple(pts[a]), tuple(pts[b]), CONNECTION_COLOR, 2)
+    for i in np.flatnonzero(visible).tolist():
+        cv2.circle(frame, tuple(pts[i]), 2, LANDMARK_COLOR, 2)
+    return frame
+
+
+def load_landmarks(path=None, video_path=None, cache_dir=None, time_key="timestamp_sec"):
+    # -> timestamps, pixel landmarks (N, 33, 4)
+    if cache_dir:
+        from landmarkcache import LandmarkCache
+
+        entry = LandmarkCache(cache_dir).ensure(video_path)
+        return entry.timestamps(), entry.pixel_landmarks()
+    from motionsegment import load_recording
+
+    timestamps, landmarks = load_recording(path, time_key)
+    if time_key == "timestamp_ms":
+        timestamps = np.asarray(timestamps) / 1000.0
+    return np.asarray(timestamps, dtype=np.float64), landmarks
+
+
+def render_video(video_path, timestamps, landmarks, out_path, fourcc="mp4v", max_frames=None):
+    # Overlays stored landmarks on the original video, matched by nearest timestamp
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("Could not open video file.")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = BackgroundVideoWriter(out_path, fps, frame_size, fourcc)
+
+    order = np.argsort(timestamps, kind="stable")
+    timestamps = np.asarray(timestamps)[order]
+    landmarks = landmarks[order]
+    tolerance = 0.5 / fps
+    frame_idx = 0
+    drawn = 0
+    started = time.perf_counter()
+    try:
+        while max_frames is None or frame_idx < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            t = frame_idx / fps
+            i = int(np.searchsorted(timestamps, t))
+            candidates = [j for j in (i - 1, i) if 0 <= j < len(timestamps)]
+            if candidates:
+                j = min(candidates, key=lambda k: abs(timestamps[k] - t))
+                if abs(timestamps[j] - t) <= tolerance:
+                    render_overlay(frame, landmarks[j])
+                    drawn += 1
+            writer.write(frame)
+            frame_idx += 1
+    finally:
+        cap.release()
+        stats = writer.close()
+    elapsed = time.perf_counter() - started
+    stats.update(frames=frame_idx, annotated=drawn, seconds=round(elapsed, 3),
+                 fps=round(frame_idx / elapsed, 2) if elapsed else None)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render annotated video from stored landmarks")
+    parser.add_argument("video")
+    parser.add_argument("--landmarks", help="pose_data.json, .npz or wide joint CSV")
+    parser.add_argument("--cache-dir", help="use (or build) the landmark cache for the video instead")
+    parser.add_argument("--time-key", default="timestamp_sec", help="timestamp_ms for detection JSON")
+    parser.add_argument("--out", help="default <video>_annotated.mp4")
+    parser.add_argument("--fourcc", default="mp4v")
+    parser.add_argument("--max-frames", type=int)
+    args = parser.parse_args()
+    if not args.landmarks and not args.cache_dir:
+        parser.error("give --landmarks or --cache-dir")
+
+    out_path = args.out or args.video.rsplit(".", 1)[0] + "_annotated.mp4"
+    timestamps, landmarks = load_landmarks(args.landmarks, args.video, args.cache_dir, args.time_key)
+    stats = render_video(args.video, timestamps, landmarks, out_path, args.fourcc, args.max_frames)
+    print(f"Rendered {stats['frames']} frames ({stats['annotated']} annotated) to {out_path} "
+          f"in {stats['seconds']}s ({stats['fps']} fps, encoder {stats['encode_ms_per_frame']} ms/frame)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,579 @@
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from posecommon import JOINT_CSV_FIELDS, NUM_LANDMARKS
+
+# Parallel conversion of the legacy JSON / CSV archive to compressed .npz.
+#
+# Handles what the capture scripts write:
+#   pose        pose_data*.json, frames of {timestamp_sec | timestamp_ms, keypoints, edges}
+#   persons     multi-person pose JSON, frames of {timestamp_sec, persons: [...]}
+#   diff        pose_diff_5s*.json, rows of {keypoint_id, from/to_timestamp, start/end_pos, diff}
+#   joint_csv   long pose_joint_data*.csv, timestamp_sec,joint,x,y,angle_deg
+# Edges are only kept as the list of (start_id, end_id) pairs, since their
+# coordinates repeat the keypoints, and diffs are recomputed from the start
+# and end positions when that gives back the stored values. Whether each
+# column was written as ints (171) or floats (171.0), and the file's line
+# ending, are stored alongside so expansion writes the same text back.
+#
+# JSON is read with a streaming parser (iter_json_list), one list element at
+# a time, so a file never has to fit in memory as Python objects. After
+# conversion the .npz is expanded again and compared byte for byte with the
+# original in a second streaming pass; outputs that would not expand to an
+# identical file are removed and reported as failed. Files are converted
+# largest first on a process pool.
+#
+#   python archivecompact.py recordings/ --out archive --workers 8
+#   python archivecompact.py --expand archive/take1/pose_data.json.npz -o pose_data.json
+#
+# <out>/archive_manifest.json lists every file with bytes in/out, kind,
+# verification result and throughput.
+
+JSON_PATTERNS = ("pose_data", "pose_diff", "poseg_data")
+CSV_PATTERNS = ("pose_joint_data",)
+KEYPOINT_DECIMALS = (2, 2, 4, 3)  # x, y, z, visibility as the scripts round them
+DIFF_DECIMALS = (2, 2, 4)
+WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+def iter_json_list(path, chunk_size=1 << 20):
+    # Yields the elements of a top-level JSON list without loading the whole file
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = 0
+
+        def skip(chars):
+            nonlocal buf, pos, eof
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                buf = f.read(chunk_size)
+                pos = 0
+                eof = not buf
+
+        skip(" \t\r\n")
+        if buf[pos:pos + 1] != "[":
+            raise ValueError(f"{path} is not a JSON list")
+        pos += 1
+        while True:
+            skip(" \t\r\n,")
+            if eof and pos >= len(buf):
+                raise ValueError(f"{path}: unexpected end of file")
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # A number cut by the chunk boundary still parses; only accept an
+                # element once the following "," or "]" has been read
+                after = WHITESPACE.match(buf, end).end()
+                if not eof and (after == len(buf) or buf[after] not in ",]"):
+                    raise json.JSONDecodeError("incomplete", buf, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(chunk_size)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield item
+            pos = end
+            if pos > chunk_size:
+                buf = buf[pos:]
+                pos = 0
+
+
+def find_sources(root):
+    sources = []
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            lower = name.lower()
+            if (lower.endswith(".json") and lower.startswith(JSON_PATTERNS)) or \
+                    (lower.endswith(".csv") and lower.startswith(CSV_PATTERNS)):
+                sources.append(os.path.join(dirpath, name))
+    return sorted(sources)
+
+
+def json_kind(path):
+    for item in iter_json_list(path):
+        if "persons" in item:
+            return "persons"
+        if "keypoints" in item:
+            return "pose"
+        if "keypoint_id" in item and "start_pos" in item:
+            return "diff"
+        return None
+    return "pose"
+
+
+# --- conversion ---
+
+def _number_array(values):
+    # int64 when every value is an int (e.g. timestamp_ms), float64 otherwise
+    if all(isinstance(v, int) for v in values):
+        return np.array(values, dtype=np.int64)
+    return np.array(values, dtype=np.float64)
+
+
+class ColumnTypes:
+    # Records whether each column of a table was written as ints or floats
+    def __init__(self, width):
+        self.seen = [set() for _ in range(width)]
+
+    def add(self, values):
+        for seen, value in zip(self.seen, values):
+            seen.add(isinstance(value, int))
+
+    def int_columns(self, name):
+        if any(len(seen) > 1 for seen in self.seen):
+            raise ValueError(f"{name} mixes int and float values in one column")
+        return np.array([True in seen for seen in self.seen])
+
+
+def _line_terminator(path):
+    with open(path, "rb") as f:
+        return "\r\n" if f.readline().endswith(b"\r\n") else "\n"
+
+
+def _keypoints_array(keypoints, types):
+    frame = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    for kp in keypoints:
+        if set(kp) != {"id", "x", "y", "z", "visibility"}:
+            raise ValueError(f"unsupported keypoint fields {sorted(kp)}")
+        values = (kp["x"], kp["y"], kp["z"], kp["visibility"])
+        types.add(values)
+        frame[kp["id"]] = values
+    return frame
+
+
+def _edge_pairs(edges, pairs):
+    found = [(e["start_id"], e["end_id"]) for e in edges]
+    if pairs is None:
+        return found
+    if found and found != pairs:
+        raise ValueError("edge list differs between frames")
+    return pairs
+
+
+def convert_pose(path):
+    timestamps = []
+    frames = []
+    pairs = None
+    time_key = None
+    has_edges = False
+    types = ColumnTypes(4)
+    for item in iter_json_list(path):
+        if time_key is None:
+            time_key = next(k for k in item if k.startswith("timestamp"))
+            has_edges = "edges" in item
+        if set(item) - {time_key, "keypoints", "edges"}:
+            raise ValueError(f"unsupported frame fields {sorted(item)}")
+        timestamps.append(item[time_key])
+        frames.append(_keypoints_array(item["keypoints"], types))
+        if item.get("edges"):
+            pairs = _edge_pairs(item["edges"], pairs)
+    return {
+        "time_key": np.array(time_key or "timestamp_sec"),
+        "has_edges": np.array(has_edges),
+        "edge_pairs": np.array(pairs or [], dtype=np.uint8).reshape(-1, 2),
+        "timestamps": _number_array(timestamps),
+        "landmarks": np.array(frames, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 4),
+        "landmark_int": types.int_columns("keypoints"),
+    }
+
+
+def convert_persons(path):
+    timestamps = []
+    person_frame = []
+    person_ids = []
+    bboxes = []
+    confs = []
+    frames = []
+    pairs = None
+    types = ColumnTypes(4)
+    bbox_types = ColumnTypes(4)
+    conf_types = ColumnTypes(1)
+    for frame_idx, item in enumerate(iter_json_list(path)):
+        if set(item) != {"timestamp_sec", "persons"}:
+            raise ValueError(f"unsupported frame fields {sorted(item)}")
+        timestamps.append(item["timestamp_sec"])
+        for person in item["persons"]:
+            if set(person) != {"person_id", "bbox", "detection_conf", "keypoints", "edges"}:
+                raise ValueError(f"unsupported person fields {sorted(person)}")
+            person_frame.append(frame_idx)
+            person_ids.append(person["person_id"])
+            bboxes.append(person["bbox"])
+            bbox_types.add(person["bbox"])
+            confs.append(person["detection_conf"])
+            conf_types.add([person["detection_conf"]])
+            frames.append(_keypoints_array(person["keypoints"], types))
+            if person["edges"]:
+                pairs = _edge_pairs(person["edges"], pairs)
+    return {
+        "edge_pairs": np.array(pairs or [], dtype=np.uint8).reshape(-1, 2),
+        "timestamps": _number_array(timestamps),
+        "person_frame": np.array(person_frame, dtype=np.uint32),
+        "person_id": np.array(person_ids, dtype=np.uint16),
+        "bbox": np.array(bboxes, dtype=np.float64).reshape(-1, 4),
+        "detection_conf": np.array(confs, dtype=np.float64),
+        "landmarks": np.array(frames, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 4),
+        "landmark_int": types.int_columns("keypoints"),
+        "bbox_int": bbox_types.int_columns("bbox"),
+        "detection_conf_int": conf_types.int_columns("detection_conf"),
+    }
+
+
+def convert_diff(path):
+    ids, t_from, t_to, start, end, diff = [], [], [], [], [], []
+    start_types, end_types, diff_types = ColumnTypes(3), ColumnTypes(3), ColumnTypes(3)
+    for item in iter_json_list(path):
+        if set(item) != {"keypoint_id", "from_timestamp", "to_timestamp", "start_pos", "end_pos", "diff"}:
+            raise ValueError(f"unsupported diff fields {sorted(item)}")
+        ids.append(item["keypoint_id"])
+        t_from.append(item["from_timestamp"])
+        t_to.append(item["to_timestamp"])
+        start.append(item["start_pos"])
+        end.append(item["end_pos"])
+        diff.append(item["diff"])
+        start_types.add(item["start_pos"])
+        end_types.add(item["end_pos"])
+        diff_types.add(item["diff"])
+    arrays = {
+        "keypoint_id": np.array(ids, dtype=np.uint8),
+        "from_timestamp": _number_array(t_from),
+        "to_timestamp": _number_array(t_to),
+        "start_pos": np.array(start, dtype=np.float64).reshape(-1, 3),
+        "end_pos": np.array(end, dtype=np.float64).reshape(-1, 3),
+        "start_pos_int": start_types.int_columns("start_pos"),
+        "end_pos_int": end_types.int_columns("end_pos"),
+    }
+    # Recomputing must give back the same text, so 3 and 3.0 don't count as equal
+    recomputed = all(json.dumps(_diff(s, e)) == json.dumps(d) for s, e, d in zip(start, end, diff))
+    if not recomputed:
+        arrays["diff"] = np.array(diff, dtype=np.float64).reshape(-1, 3)
+        arrays["diff_int"] = diff_types.int_columns("diff")
+    return arrays
+
+
+def _csv_number(text):
+    if text == "":
+        return float("nan")
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def convert_joint_csv(path):
+    run_values, run_lengths = [], []
+    joints, names = [], {}
+    columns = {"x": [], "y": [], "angle_deg": []}
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        if next(reader, None) != JOINT_CSV_FIELDS:
+            raise ValueError("not a long joint CSV")
+        for row in reader:
+            ts, joint, x, y, angle = row
+            if run_values and run_values[-1] == ts:
+                run_lengths[-1] += 1
+            else:
+                run_values.append(ts)
+                run_lengths.append(1)
+            joints.append(names.setdefault(joint, len(names)))
+            columns["x"].append(_csv_number(x))
+            columns["y"].append(_csv_number(y))
+            columns["angle_deg"].append(_csv_number(angle))
+    arrays = {
+        "timestamps": _number_array([_csv_number(v) for v in run_values]),
+        "timestamp_runs": np.array(run_lengths, dtype=np.uint32),
+        "joint_names": np.array(list(names)),
+        "joint": np.array(joints, dtype=np.uint16),
+    }
+    for name, values in columns.items():
+        arrays[name] = _number_array(values)
+    return arrays
+
+
+CONVERTERS = {"pose": convert_pose, "persons": convert_persons, "diff": convert_diff,
+              "joint_csv": convert_joint_csv}
+
+
+# --- expansion back to the legacy structures ---
+
+def _diff(start, end):
+    return [round(e - s, d) for s, e, d in zip(start, end, DIFF_DECIMALS)]
+
+
+def _typed(values, int_columns):
+    return [int(v) if is_int else v for v, is_int in zip(values, int_columns)]
+
+
+def _keypoint_dicts(frame, int_columns):
+    keypoints = []
+    for idx, values in enumerate(frame.tolist()):
+        if values[0] != values[0]:
+            continue
+        x, y, z, vis = (int(v) if is_int else round(v, d)
+                        for v, d, is_int in zip(values, KEYPOINT_DECIMALS, int_columns))
+        keypoints.append({"id": idx, "x": x, "y": y, "z": z, "visibility": vis})
+    return keypoints
+
+
+def _edge_dicts(keypoints, pairs):
+    if not keypoints:
+        return []
+    by_id = {kp["id"]: kp for kp in keypoints}
+    return [{"start_id": a, "end_id": b,
+             "start_xy": [by_id[a]["x"], by_id[a]["y"]],
+             "end_xy": [by_id[b]["x"], by_id[b]["y"]]} for a, b in pairs]
+
+
+def expand_pose(arrays):
+    time_key = str(arrays["time_key"])
+    has_edges = bool(arrays["has_edges"])
+    pairs = arrays["edge_pairs"].tolist()
+    int_columns = arrays["landmark_int"].tolist()
+    for ts, frame in zip(arrays["timestamps"].tolist(), arrays["landmarks"]):
+        keypoints = _keypoint_dicts(frame, int_columns)
+        item = {time_key: ts, "keypoints": keypoints}
+        if has_edges:
+            item["edges"] = _edge_dicts(keypoints, pairs)
+        yield item
+
+
+def expand_persons(arrays):
+    pairs = arrays["edge_pairs"].tolist()
+    person_frame = arrays["person_frame"]
+    bounds = np.searchsorted(person_frame, np.arange(len(arrays["timestamps"]) + 1))
+    int_columns = arrays["landmark_int"].tolist()
+    bbox_int = arrays["bbox_int"].tolist()
+    conf_int = arrays["detection_conf_int"].tolist()
+    for frame_idx, ts in enumerate(arrays["timestamps"].tolist()):
+        persons = []
+        for p in range(bounds[frame_idx], bounds[frame_idx + 1]):
+            keypoints = _keypoint_dicts(arrays["landmarks"][p], int_columns)
+            persons.append({
+                "person_id": int(arrays["person_id"][p]),
+                "bbox": _typed(arrays["bbox"][p].tolist(), bbox_int),
+                "detection_conf": _typed([float(arrays["detection_conf"][p])], conf_int)[0],
+                "keypoints": keypoints,
+                "edges": _edge_dicts(keypoints, pairs),
+            })
+        yield {"timestamp_sec": ts, "persons": persons}
+
+
+def expand_diff(arrays):
+    diffs = arrays["diff"].tolist() if "diff" in arrays else None
+    start_int = arrays["start_pos_int"].tolist()
+    end_int = arrays["end_pos_int"].tolist()
+    diff_int = arrays["diff_int"].tolist() if diffs is not None else None
+    rows = zip(arrays["keypoint_id"].tolist(), arrays["from_timestamp"].tolist(),
+               arrays["to_timestamp"].tolist(), arrays["start_pos"].tolist(), arrays["end_pos"].tolist())
+    for i, (kp_id, t_from, t_to, start, end) in enumerate(rows):
+        start = _typed(start, start_int)
+        end = _typed(end, end_int)
+        yield {
+            "keypoint_id": kp_id,
+            "from_timestamp": t_from,
+            "to_timestamp": t_to,
+            "start_pos": start,
+            "end_pos": end,
+            "diff": _typed(diffs[i], diff_int) if diffs is not None else _diff(start, end),
+        }
+
+
+def _csv_text(value):
+    return "" if value != value else str(value)
+
+
+def expand_joint_csv(arrays):
+    # Yields CSV rows as lists of strings, header first
+    yield JOINT_CSV_FIELDS
+    names = arrays["joint_names"].tolist()
+    timestamps = np.repeat(np.array([_csv_text(v) for v in arrays["timestamps"].tolist()], dtype=object),
+                           arrays["timestamp_runs"])
+    for ts, joint, x, y, angle in zip(timestamps.tolist(), arrays["joint"].tolist(), arrays["x"].tolist(),
+                                      arrays["y"].tolist(), arrays["angle_deg"].tolist()):
+        yield [ts, names[joint], _csv_text(x), _csv_text(y), _csv_text(angle)]
+
+
+EXPANDERS = {"pose": expand_pose, "persons": expand_persons, "diff": expand_diff,
+             "joint_csv": expand_joint_csv}
+# Keys every archive of a kind must carry to expand byte for byte; diff_int only goes with a stored diff
+REQUIRED_KEYS = {"pose": ["landmark_int"],
+                 "persons": ["landmark_int", "bbox_int", "detection_conf_int"],
+                 "diff": ["start_pos_int", "end_pos_int"],
+                 "joint_csv": []}
+
+
+def load_archive(npz_path):
+    with np.load(npz_path) as data:
+        arrays = {name: data[name] for name in data.files}
+    kind = str(arrays.pop("kind"))
+    required = REQUIRED_KEYS[kind] + ["line_terminator"]
+    if "diff" in arrays:
+        required.append("diff_int")
+    missing = [name for name in required if name not in arrays]
+    if missing:
+        raise ValueError(f"{npz_path} lacks {', '.join(missing)}; "
+                         f"re-run archivecompact on the original file to rebuild it")
+    return kind, arrays
+
+
+def expanded_text(kind, arrays, chunk_size=1 << 16):
+    # Yields the original file's text in chunks: CSV as csv.DictWriter wrote it,
+    # JSON as json.dump(items, f, indent=2) / JsonListWriter wrote it
+    terminator = str(arrays["line_terminator"])
+    if kind == "joint_csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator=terminator)
+        for row in EXPANDERS[kind](arrays):
+            writer.writerow(row)
+            if buf.tell() > chunk_size:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+        return
+    count = 0
+    for item in EXPANDERS[kind](arrays):
+        chunk = ("[\n  " if count == 0 else ",\n  ") + json.dumps(item, indent=2).replace("\n", "\n  ")
+        yield chunk if terminator == "\n" else chunk.replace("\n", terminator)
+        count += 1
+    end = "\n]" if count else "[]"
+    yield end if terminator == "\n" else end.replace("\n", terminator)
+
+
+def expand_file(npz_path, out_path):
+    kind, arrays = load_archive(npz_path)
+    with open(out_path, "w", newline="") as f:
+        for chunk in expanded_text(kind, arrays):
+            f.write(chunk)
+    return kind
+
+
+# --- verification ---
+
+def verify(source, kind, arrays):
+    # Second streaming pass: the expanded text must match the original byte for byte
+    with open(source, "rb") as f:
+        for chunk in expanded_text(kind, arrays):
+            data = chunk.encode()
+            if f.read(len(data)) != data:
+                return False
+        return f.read(1) == b""
+
+
+# --- batch ---
+
+def archive_path(out_dir, root, source):
+    return os.path.join(out_dir, os.path.relpath(source, root) + ".npz")
+
+
+def compact_file(source, target):
+    # Runs in a worker process
+    started = time.perf_counter()
+    bytes_in = os.path.getsize(source)
+    entry = {"source": source, "target": target, "bytes_in": bytes_in}
+    try:
+        kind = "joint_csv" if source.lower().endswith(".csv") else json_kind(source)
+        if kind is None:
+            raise ValueError("unrecognized JSON layout")
+        arrays = CONVERTERS[kind](source)
+        arrays["line_terminator"] = np.array(_line_terminator(source))
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        np.savez_compressed(target, kind=np.array(kind), **arrays)
+        _, stored = load_archive(target)
+        verified = verify(source, kind, stored)
+        if not verified:
+            os.remove(target)
+        entry.update(kind=kind, verified=verified, bytes_out=os.path.getsize(target) if verified else 0)
+    except Exception as e:
+        entry.update(kind=None, verified=False, bytes_out=0, error=repr(e))
+    elapsed = time.perf_counter() - started
+    entry["seconds"] = round(elapsed, 3)
+    entry["mb_per_sec"] = round(bytes_in / 1e6 / elapsed, 2) if elapsed else None
+    return entry
+
+
+def compact(root, out_dir, workers=None):
+    sources = find_sources(root)
+    # Largest first so one big file doesn't start last and hold up the pool
+    sources.sort(key=os.path.getsize, reverse=True)
+    os.makedirs(out_dir, exist_ok=True)
+
+    entries = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(compact_file, source, archive_path(out_dir, root, source))
+                   for source in sources]
+        for future in as_completed(futures):
+            entry = future.result()
+            entries.append(entry)
+            status = "ok" if entry["verified"] else "FAILED " + entry.get("error", "expanded file differs")
+            print(f"{status:<6} {entry['source']}: {entry['bytes_in']:,} -> {entry['bytes_out']:,} bytes "
+                  f"({entry['mb_per_sec']} MB/s)")
+    elapsed = time.perf_counter() - started
+
+    converted = [e for e in entries if e["verified"]]
+    bytes_in = sum(e["bytes_in"] for e in converted)
+    bytes_out = sum(e["bytes_out"] for e in converted)
+    report = {
+        "root": os.path.abspath(root),
+        "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "workers": workers or os.cpu_count(),
+        "wall_sec": round(elapsed, 3),
+        "files": len(entries),
+        "converted": len(converted),
+        "failed": len(entries) - len(converted),
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "bytes_saved": bytes_in - bytes_out,
+        "mb_per_sec": round(sum(e["bytes_in"] for e in entries) / 1e6 / elapsed, 2) if elapsed else None,
+        "entries": sorted(entries, key=lambda e: e["source"]),
+    }
+    with open(os.path.join(out_dir, "archive_manifest.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the JSON/CSV pose archive to compressed .npz")
+    parser.add_argument("root", nargs="?", help="directory with pose_data*.json / pose_joint_data*.csv")
+    parser.add_argument("--out", default="archive")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--expand", help="turn one .npz back into its original format")
+    parser.add_argument("-o", "--output", help="output path for --expand")
+    args = parser.parse_args()
+
+    if args.expand:
+        out_path = args.output or args.expand[:-4]
+        kind = expand_file(args.expand, out_path)
+        print(f"Expanded {kind} archive to {out_path}")
+        return
+    if not args.root:
+        parser.error("give a directory to convert, or --expand")
+
+    report = compact(args.root, args.out, args.workers)
+    saved = report["bytes_saved"]
+    ratio = report["bytes_in"] / report["bytes_out"] if report["bytes_out"] else 0
+    print(f"{report['converted']} converted, {report['failed']} failed in {report['wall_sec']}s "
+          f"({report['mb_per_sec']} MB/s)")
+    print(f"{report['bytes_in']:,} -> {report['bytes_out']:,} bytes, {saved:,} saved ({ratio:.1f}x)")
+    print(f"Manifest saved to {os.path.join(args.out, 'archive_manifest.json')}")
+
+
+if __name__ == "__main__":
+    main()
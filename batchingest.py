@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from posecommon import file_digest
+
+# Watch-folder / manifest batch ingestion of many videos.
+#
+# Videos are probed for their duration and scheduled shortest first on a
+# bounded process pool. Each video gets <out>/<name>-<content hash>/ with
+# pose_joint_data.csv, pose_data.json and job.json, so takes that share a file
+# name in different folders never share a job; a video whose content hash,
+# Pose settings and CSV layout match an existing job.json is skipped, and
+# byte-identical copies in one batch are processed once. Processing itself is
+# checkpointrun.process, so a killed batch resumes each video where it was.
+#
+#   python batchingest.py --manifest todays_takes.txt --out ingest --workers 4
+#   python batchingest.py --watch incoming/ --out ingest --workers 4
+#
+# Every run writes <out>/ingest_summary.json with per-job throughput.
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".m4v")
+
+
+def read_manifest(path):
+    # One path per line (# comments allowed), or a JSON list of paths
+    with open(path, "r") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        paths = json.loads(text)
+    else:
+        paths = [line.strip() for line in text.splitlines()
+                 if line.strip() and not line.strip().startswith("#")]
+    base = os.path.dirname(os.path.abspath(path))
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in paths]
+
+
+def list_videos(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(VIDEO_EXTENSIONS))
+
+
+def probe_duration(video_path):
+    # Seconds of video, falling back to file size when cv2 can't tell
+    try:
+        import cv2
+
+        cap = cv2.VideoCapture(video_path)
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        if frames > 0 and fps > 0:
+            return frames / fps
+    except ImportError:
+        pass
+    return os.path.getsize(video_path) / 1e6
+
+
+def job_dir(out_dir, video_path):
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(out_dir, f"{name}-{file_digest(video_path)[:12]}")
+
+
+def is_up_to_date(out_dir, video_path, pose_settings, csv_layout="long"):
+    target = job_dir(out_dir, video_path)
+    job_path = os.path.join(target, "job.json")
+    if not os.path.exists(job_path):
+        return False
+    with open(job_path, "r") as f:
+        job = json.load(f)
+    outputs_exist = all(os.path.exists(os.path.join(target, name)) for name in job.get("outputs", []))
+    return (outputs_exist
+            and job.get("video_hash") == file_digest(video_path)
+            and job.get("pose_settings") == pose_settings
+            and job.get("csv_layout", "long") == csv_layout)
+
+
+def run_job(video_path, out_dir, pose_settings, csv_layout):
+    # Runs in a worker process
+    from checkpointrun import process
+
+    target = job_dir(out_dir, video_path)
+    os.makedirs(target, exist_ok=True)
+    csv_path = os.path.join(target, "pose_joint_data.csv")
+    json_path = os.path.join(target, "pose_data.json")
+
+    started = time.perf_counter()
+    frames = process(video_path, csv_path, json_path, pose_settings, csv_layout=csv_layout)
+    elapsed = time.perf_counter() - started
+
+    job = {
+        "video": os.path.abspath(video_path),
+        "video_hash": file_digest(video_path),
+        "pose_settings": pose_settings,
+        "csv_layout": csv_layout,
+        "outputs": ["pose_joint_data.csv", "pose_data.json"],
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed else None,
+        "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(target, "job.json"), "w") as f:
+        json.dump(job, f, indent=2)
+    return job
+
+
+def ingest(videos, out_dir, workers=2, pose_settings=None, csv_layout="long"):
+    pose_settings = pose_settings or {}
+    os.makedirs(out_dir, exist_ok=True)
+    summary = []
+
+    pending = []
+    scheduled = {}
+    for video in videos:
+        if is_up_to_date(out_dir, video, pose_settings, csv_layout):
+            summary.append({"video": video, "status": "skipped"})
+        elif job_dir(out_dir, video) in scheduled:
+            # Same content as a video already in this batch; its job covers both
+            summary.append({"video": video, "status": "skipped", "same_as": scheduled[job_dir(out_dir, video)]})
+        else:
+            scheduled[job_dir(out_dir, video)] = video
+            pending.append((probe_duration(video), video))
+    # Shortest job first keeps results flowing and the pool busy at the tail
+    pending.sort()
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, video, out_dir, pose_settings, csv_layout): (duration, video)
+                   for duration, video in pending}
+        for future in as_completed(futures):
+            duration, video = futures[future]
+            try:
+                job = future.result()
+                summary.append({"video": video, "status": "done", "duration_sec": round(duration, 2),
+                                "frames": job["frames"], "seconds": job["seconds"], "fps": job["fps"]})
+                print(f"done    {video}: {job['frames']} frames in {job['seconds']}s ({job['fps']} fps)")
+            except Exception as e:
+                summary.append({"video": video, "status": "failed", "error": repr(e)})
+                print(f"failed  {video}: {e!r}")
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "workers": workers,
+        "wall_sec": round(elapsed, 3),
+        "videos": len(videos),
+        "processed": sum(1 for s in summary if s["status"] == "done"),
+        "skipped": sum(1 for s in summary if s["status"] == "skipped"),
+        "failed": sum(1 for s in summary if s["status"] == "failed"),
+        "frames": sum(s.get("frames", 0) for s in summary),
+        "jobs": summary,
+    }
+    with open(os.path.join(out_dir, "ingest_summary.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def watch(directory, out_dir, workers, pose_settings, csv_layout, interval=10.0):
+    # Poll the folder; a file is picked up once its size is stable across two polls
+    sizes = {}
+    print(f"Watching {directory} (Ctrl+C to stop)")
+    while True:
+        ready = []
+        for video in list_videos(directory):
+            size = os.path.getsize(video)
+            if sizes.get(video) == size:
+                ready.append(video)
+            sizes[video] = size
+        todo = [v for v in ready if not is_up_to_date(out_dir, v, pose_settings, csv_layout)]
+        if todo:
+            report = ingest(todo, out_dir, workers, pose_settings, csv_layout)
+            print(f"Batch: {report['processed']} processed, {report['failed']} failed "
+                  f"in {report['wall_sec']}s")
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch pose ingestion for many videos")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="text file with one video per line, or a JSON list")
+    source.add_argument("--watch", help="directory to watch for new videos")
+    source.add_argument("--dir", help="process every video in a directory once")
+    parser.add_argument("--out", default="ingest")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--model-complexity", type=int, default=1)
+    parser.add_argument("--csv-layout", choices=["long", "wide"], default="long")
+    parser.add_argument("--interval", type=float, default=10.0, help="watch poll interval (s)")
+    args = parser.parse_args()
+
+    pose_settings = {"model_complexity": args.model_complexity}
+    if args.watch:
+        try:
+            watch(args.watch, args.out, args.workers, pose_settings, args.csv_layout, args.interval)
+        except KeyboardInterrupt:
+            print("Stopped watching.")
+        return
+
+    videos = read_manifest(args.manifest) if args.manifest else list_videos(args.dir)
+    report = ingest(videos, args.out, args.workers, pose_settings, args.csv_layout)
+    print(f"{report['processed']} processed, {report['skipped']} skipped, {report['failed']} failed, "
+          f"{report['frames']} frames in {report['wall_sec']}s")
+    print(f"Summary saved to {os.path.join(args.out, 'ingest_summary.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import numpy as np
+
+from posecommon import JOINT_CSV_FIELDS, JOINT_SETS, LANDMARK_NAMES, NUM_LANDMARKS, joint_angles
+
+# Batched joint CSV writer.
+#
+# Replaces one csv.DictWriter.writerow({...}) per landmark / joint (39 dicts
+# per frame) with fixed-layout numpy buffers. Frames are appended as (33, 2)
+# pixel coordinates, angles are computed vectorized per block and the whole
+# block is formatted with one precompiled template per frame. Rows end in
+# "\r\n" and a joint whose vectors have zero length gets angle 0, exactly as
+# csv.DictWriter and calculate_angle wrote them.
+#
+#   writer = JointCsvWriter("pose_joint_data.csv", layout="long")
+#   writer.add_frame(timestamp, [(x, y), ...])   # 33 pixel coords
+#   writer.close()
+#
+# layout="long" writes the usual timestamp_sec,joint,x,y,angle_deg rows,
+# layout="wide" writes one row per frame:
+#   timestamp_sec,NOSE_x,NOSE_y,...,left_elbow_angle_deg,...
+# which is several times smaller and can be read back with read_wide_csv().
+
+
+def wide_fields(joint_sets=JOINT_SETS):
+    fields = ["timestamp_sec"]
+    for name in LANDMARK_NAMES:
+        fields += [f"{name}_x", f"{name}_y"]
+    fields += [f"{name}_angle_deg" for name in joint_sets]
+    return fields
+
+
+def _long_template(joint_sets):
+    # {0} timestamp, {1..66} landmark x/y, then joint center x/y, then angles
+    lines = []
+    for idx, name in enumerate(LANDMARK_NAMES):
+        lines.append(f"{{0}},{name},{{{1 + 2 * idx}}},{{{2 + 2 * idx}}},\r\n")
+    centers = 1 + 2 * NUM_LANDMARKS
+    angles = centers + 2 * len(joint_sets)
+    for j, name in enumerate(joint_sets):
+        lines.append(f"{{0}},{name},{{{centers + 2 * j}}},{{{centers + 2 * j + 1}}},{{{angles + j}}}\r\n")
+    return "".join(lines)
+
+
+def _wide_template(joint_sets):
+    count = 1 + 2 * NUM_LANDMARKS + len(joint_sets)
+    return ",".join(f"{{{i}}}" for i in range(count)) + "\r\n"
+
+
+class JointCsvWriter:
+    def __init__(self, path, layout="long", block_frames=256, joint_sets=JOINT_SETS, append=False):
+        if layout not in ("long", "wide"):
+            raise ValueError(f"Unknown CSV layout {layout!r}")
+        self.path = path
+        self.layout = layout
+        self.joint_sets = joint_sets
+        self.block_frames = block_frames
+        self.joint_idx = np.array(list(joint_sets.values()))
+        self.centers = self.joint_idx[:, 1]
+        self._timestamps = np.empty(block_frames, dtype=np.float64)
+        self._xy = np.empty((block_frames, NUM_LANDMARKS, 2), dtype=np.int64)
+        self._n = 0
+        self.frames_written = 0
+
+        if layout == "long":
+            self._template = _long_template(joint_sets)
+            header = ",".join(JOINT_CSV_FIELDS)
+        else:
+            self._template = _wide_template(joint_sets)
+            header = ",".join(wide_fields(joint_sets))
+        # append=True continues an existing file (e.g. after a checkpoint resume)
+        self.file = open(path, "a" if append else "w", newline="")
+        if self.file.tell() == 0:
+            self.file.write(header + "\r\n")
+
+    def add_frame(self, timestamp, xy):
+        # xy: 33 (x, y) pixel coordinates, truncated to int like the scripts do
+        self._timestamps[self._n] = timestamp
+        self._xy[self._n] = np.trunc(np.asarray(xy, dtype=np.float64)[:, :2])
+        self._n += 1
+        if self._n == self.block_frames:
+            self.flush()
+
+    def add_frames(self, timestamps, landmarks):
+        # Whole (frames, 33, >=2) array at once; all-NaN frames are skipped
+        self.flush()
+        landmarks = np.asarray(landmarks)
+        detected = ~np.isnan(landmarks[:, :, 0]).all(axis=1)
+        timestamps = np.asarray(timestamps)[detected]
+        xy = np.trunc(landmarks[detected, :, :2]).astype(np.int64)
+        for start in range(0, len(xy), self.block_frames):
+            self._write_block(timestamps[start:start + self.block_frames],
+                              xy[start:start + self.block_frames])
+
+    def flush(self):
+        if self._n:
+            self._write_block(self._timestamps[:self._n], self._xy[:self._n])
+            self._n = 0
+        self.file.flush()
+
+    def _angle_rows(self, xy):
+        angles = joint_angles(xy, self.joint_sets).tolist()
+        # calculate_angle returns int 0 (written "0", not "0.0") when a vector has zero length
+        a, b, c = (xy[:, self.joint_idx[:, k], :] for k in range(3))
+        degenerate = (a == b).all(axis=-1) | (c == b).all(axis=-1)
+        for i, j in zip(*np.nonzero(degenerate)):
+            angles[i][j] = 0
+        return angles
+
+    def _write_block(self, timestamps, xy):
+        angles = self._angle_rows(xy)
+        coords = xy.reshape(len(xy), -1)
+        if self.layout == "long":
+            centers = xy[:, self.centers, :].reshape(len(xy), -1).tolist()
+            tails = [c + a for c, a in zip(centers, angles)]
+        else:
+            tails = angles
+        template = self._template
+        self.file.write("".join(template.format(ts, *row, *tail)
+                                for ts, row, tail in zip(timestamps.tolist(), coords.tolist(), tails)))
+        self.frames_written += len(xy)
+
+    def tell(self):
+        # Byte offset after everything added so far has been written
+        self.flush()
+        return self.file.tell()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_wide_csv(path, joint_sets=JOINT_SETS):
+    # -> timestamps (N,), xy (N, 33, 2), angles (N, len(joint_sets))
+    data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+    timestamps = data[:, 0]
+    xy = data[:, 1:1 + 2 * NUM_LANDMARKS].reshape(-1, NUM_LANDMARKS, 2)
+    angles = data[:, 1 + 2 * NUM_LANDMARKS:1 + 2 * NUM_LANDMARKS + len(joint_sets)]
+    return timestamps, xy, angles
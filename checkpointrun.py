@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import signal
+import time
+
+import numpy as np
+
+from bulkcsvwriter import JointCsvWriter
+from posecommon import (DEFAULT_POSE_SETTINGS, NUM_LANDMARKS, arrays_to_pose_json, file_digest,
+                        landmarks_to_array, to_pixels)
+
+# Incremental, resumable offline processing of long videos.
+#
+# Same outputs as csvardoposejason.py / jasonflashmobyolov5.py (long joint CSV
+# and pose_data.json), but progress is persisted as it goes:
+#   - the joint CSV is appended in blocks,
+#   - keypoints + edges are appended one frame per line to <json>.partial.jsonl,
+#   - every --every frames both are flushed + fsynced and <json>.checkpoint
+#     records the next frame index, the byte length of each output and the
+#     CSV layout.
+# Ctrl+C is held back while a frame's CSV rows and JSON line are written, so
+# a checkpoint always ends on a whole frame. On restart the outputs are
+# truncated back to the checkpoint, the capture is seeked to the next frame
+# and processing continues; resuming with a different --csv-layout is
+# refused. When the video is done the JSON lines are assembled into the
+# usual pose_data.json list.
+#
+#   python checkpointrun.py kannadu.mp4 --csv pose_joint_data.csv --json pose_data.json
+
+
+def fsync_file(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def truncate(path, size):
+    if os.path.exists(path):
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.state = None
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.state = json.load(f)
+
+    def matches(self, video_hash, pose_settings):
+        return (self.state is not None
+                and self.state["video_hash"] == video_hash
+                and self.state["pose_settings"] == pose_settings)
+
+    def csv_layout(self):
+        # Checkpoints from before the layout was recorded were always long
+        return self.state.get("csv_layout", "long")
+
+    def save(self, **state):
+        state["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+            fsync_file(f)
+        os.replace(tmp_path, self.path)
+        self.state = state
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class DeferInterrupt:
+    # Delays Ctrl+C (SIGINT) to the end of the block; a no-op outside the main thread
+    def __enter__(self):
+        self.received = False
+        try:
+            self.previous = signal.signal(signal.SIGINT, self._handler)
+        except ValueError:
+            self.previous = None
+        return self
+
+    def _handler(self, signum, frame):
+        self.received = True
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.previous is not None:
+            signal.signal(signal.SIGINT, self.previous)
+            if self.received and exc_type is None:
+                raise KeyboardInterrupt
+
+
+def seek(cap, frame_idx):
+    # Seek by frame index; fall back to grabbing when the container can't seek
+    import cv2
+
+    if frame_idx == 0:
+        return
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_idx:
+        return
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    for _ in range(frame_idx):
+        if not cap.grab():
+            break
+
+
+def assemble_json(jsonl_path, json_path):
+    # JSON lines -> the indented list the other scripts read, one frame at a time
+    tmp_path = json_path + ".tmp"
+    with open(jsonl_path, "r") as src, open(tmp_path, "w") as dst:
+        dst.write("[")
+        for i, line in enumerate(src):
+            chunk = json.dumps(json.loads(line), indent=2)
+            dst.write(("," if i else "") + "\n  " + chunk.replace("\n", "\n  "))
+        dst.write("\n]")
+    os.replace(tmp_path, json_path)
+
+
+def process(video_path, csv_path, json_path, pose_settings=None, every=300, csv_layout="long"):
+    import cv2
+    import mediapipe as mp
+
+    pose_settings = dict(DEFAULT_POSE_SETTINGS, **(pose_settings or {}))
+    video_hash = file_digest(video_path)
+    jsonl_path = json_path + ".partial.jsonl"
+    checkpoint = Checkpoint(json_path + ".checkpoint")
+
+    if checkpoint.matches(video_hash, pose_settings):
+        if checkpoint.csv_layout() != csv_layout:
+            raise ValueError(f"{csv_path} was started with --csv-layout {checkpoint.csv_layout()}; "
+                             f"resume with that layout or delete {checkpoint.path} to start over")
+        start_frame = checkpoint.state["next_frame"]
+        truncate(csv_path, checkpoint.state["csv_bytes"])
+        truncate(jsonl_path, checkpoint.state["jsonl_bytes"])
+        append = True
+        print(f"Resuming {video_path} at frame {start_frame}")
+    else:
+        start_frame = 0
+        append = False
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("Could not open video file.")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    seek(cap, start_frame)
+
+    pose = mp.solutions.pose.Pose(**pose_settings)
+    csv_writer = JointCsvWriter(csv_path, layout=csv_layout, append=append)
+    jsonl_file = open(jsonl_path, "a" if append else "w")
+
+    def save_checkpoint(next_frame):
+        csv_bytes = csv_writer.tell()
+        fsync_file(csv_writer.file)
+        fsync_file(jsonl_file)
+        checkpoint.save(video=os.path.basename(video_path), video_hash=video_hash,
+                        pose_settings=pose_settings, csv_layout=csv_layout, next_frame=next_frame,
+                        csv_bytes=csv_bytes, jsonl_bytes=jsonl_file.tell())
+
+    no_person = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    frame_idx = start_frame
+    started = time.perf_counter()
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = round(frame_idx / fps, 3)
+            h, w = frame.shape[:2]
+            results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            landmarks = landmarks_to_array(results.pose_landmarks)
+            if landmarks is not None:
+                landmarks = to_pixels(landmarks, w, h)
+            # No detection -> an all-NaN frame, written with empty keypoints/edges
+            frame_landmarks = landmarks if landmarks is not None else no_person
+            record = arrays_to_pose_json(np.array([timestamp]), frame_landmarks[None], with_edges=True)[0]
+            line = json.dumps(record) + "\n"
+            # Both outputs and frame_idx move together, or not at all
+            with DeferInterrupt():
+                if landmarks is not None:
+                    csv_writer.add_frame(timestamp, landmarks)
+                jsonl_file.write(line)
+                frame_idx += 1
+            if frame_idx % every == 0:
+                save_checkpoint(frame_idx)
+    except KeyboardInterrupt:
+        save_checkpoint(frame_idx)
+        print(f"Interrupted at frame {frame_idx}; rerun to resume")
+        raise
+    finally:
+        cap.release()
+        pose.close()
+
+    csv_writer.close()
+    jsonl_file.close()
+    assemble_json(jsonl_path, json_path)
+    # Checkpoint first: a checkpoint left pointing at a deleted jsonl can't be resumed
+    checkpoint.remove()
+    os.remove(jsonl_path)
+
+    elapsed = time.perf_counter() - started
+    done = frame_idx - start_frame
+    print(f"Processed {done} frames in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} fps)")
+    return frame_idx
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable offline pose processing")
+    parser.add_argument("video")
+    parser.add_argument("--csv", default="pose_joint_data.csv")
+    parser.add_argument("--csv-layout", choices=["long", "wide"], default="long")
+    parser.add_argument("--json", default="pose_data.json")
+    parser.add_argument("--every", type=int, default=300, help="checkpoint every N frames")
+    parser.add_argument("--model-complexity", type=int, default=DEFAULT_POSE_SETTINGS["model_complexity"])
+    args = parser.parse_args()
+
+    process(args.video, args.csv, args.json, {"model_complexity": args.model_complexity},
+            args.every, args.csv_layout)
+    print(f"Pose data saved to {args.csv} and {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import cv2
 import time
-import csv
 import math
 import json
 import mediapipe as mp
+from poseprofiler import FrameProfiler
+from bulkcsvwriter import JointCsvWriter
 
 # Initialize MediaPipe Pose
 mp_pose = mp.solutions.pose
@@ -22,12 +23,15 @@ if not cap.isOpened():
 
 fps = cap.get(cv2.CAP_PROP_FPS)
 
-# CSV Setup
+# CSV Setup (rows are buffered and written in blocks)
 csv_filename = "pose_joint_data.csv"
-csv_fields = ["timestamp_sec", "joint", "x", "y", "angle_deg"]
-csv_file = open(csv_filename, mode="w", newline="")
-csv_writer = csv.DictWriter(csv_file, fieldnames=csv_fields)
-csv_writer.writeheader()
+csv_layout = "long"  # "wide" writes one row per frame, several times smaller
+csv_writer = JointCsvWriter(csv_filename, layout=csv_layout)
+
+# Profiling (per-stage timings, summary written at exit)
+profile_summary_path = "pose_profile_summary.json"
+profile_trace_path = None  # e.g. "pose_profile_trace.jsonl" for per-frame timings
+profiler = FrameProfiler(profile_trace_path)
 
 # Angle calculation (safe acos with clamping)
 def calculate_angle(a, b, c):
@@ -52,18 +56,20 @@ joint_sets = {
     "right_knee": (mp_pose.PoseLandmark.RIGHT_HIP, mp_pose.PoseLandmark.RIGHT_KNEE, mp_pose.PoseLandmark.RIGHT_ANKLE)
 }
 
-landmark_names = {lm.value: lm.name for lm in mp_pose.PoseLandmark}
-
 frame_idx = 0
 
 while True:
+    profiler.start_frame()
     ret, frame = cap.read()
     if not ret:
         break
+    profiler.lap("decode")
 
     timestamp = round(frame_idx / fps, 3)
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    profiler.lap("color")
     results = pose.process(frame_rgb)
+    profiler.lap("inference")
 
     if results.pose_landmarks:
         h, w = frame.shape[:2]
@@ -73,13 +79,8 @@ while True:
         for idx, lm in enumerate(results.pose_landmarks.landmark):
             x, y = int(lm.x * w), int(lm.y * h)
             lm_dict[idx] = (x, y)
-            csv_writer.writerow({
-                "timestamp_sec": timestamp,
-                "joint": landmark_names.get(idx, f"id_{idx}"),
-                "x": x,
-                "y": y,
-                "angle_deg": ""
-            })
+        csv_writer.add_frame(timestamp, list(lm_dict.values()))
+        profiler.lap("serialize")
 
         # Angles with arcs and text
         for name, (a_idx, b_idx, c_idx) in joint_sets.items():
@@ -87,27 +88,24 @@ while True:
                 a, b, c = lm_dict[a_idx.value], lm_dict[b_idx.value], lm_dict[c_idx.value]
                 angle = calculate_angle(a, b, c)
                 bx, by = b
-
-                # Save to CSV
-                csv_writer.writerow({
-                    "timestamp_sec": timestamp,
-                    "joint": name,
-                    "x": bx,
-                    "y": by,
-                    "angle_deg": angle
-                })
+                profiler.lap("angles")
 
                 # Draw angle text
                 cv2.putText(frame, f"{angle}°", (bx + 10, by - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
                 # Draw arc (ellipse)
                 cv2.ellipse(frame, (bx, by), (20, 20), 0, 0, angle, (255, 0, 255), 2)
+                profiler.lap("draw")
 
         # Draw skeleton
         mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+        profiler.lap("draw")
 
     cv2.imshow("Pose Estimation with Joint Angles", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    key = cv2.waitKey(1) & 0xFF
+    profiler.lap("display")
+    profiler.end_frame()
+    if key == ord('q'):
         break
 
     frame_idx += 1
@@ -116,6 +114,10 @@ while True:
 cap.release()
 cv2.destroyAllWindows()
 pose.close()
-csv_file.close()
+csv_writer.close()
+profiler.close()
+profiler.write_summary(profile_summary_path)
+profiler.print_summary()
 print(f"Pose and angle data saved to {csv_filename}")
+print(f"Profiling summary saved to {profile_summary_path}")
 
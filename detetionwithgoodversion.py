@@ -2,6 +2,7 @@ import cv2
 import time
 import json
 import mediapipe as mp
+from poseprofiler import FrameProfiler
 
 # Initialize MediaPipe Pose
 mp_pose = mp.solutions.pose
@@ -28,20 +29,29 @@ frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 # Initialize data storage
 frame_data = []
 
+# Profiling (per-stage timings, summary written at exit)
+profile_summary_path = "poseg_data_profile.json"
+profile_trace_path = None  # e.g. "poseg_data_trace.jsonl" for per-frame timings
+profiler = FrameProfiler(profile_trace_path)
+
 print("Processing video. Press 'q' to quit.")
 
 frame_idx = 0
 while True:
+    profiler.start_frame()
     ret, frame = cap.read()
     if not ret:
         break
+    profiler.lap("decode")
 
     # Calculate timestamp in milliseconds
     timestamp_ms = round((frame_idx / fps) * 1000, 3)
 
     # Convert the BGR image to RGB before processing.
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    profiler.lap("color")
     results = pose.process(frame_rgb)
+    profiler.lap("inference")
 
     keypoints = []
     edges = []
@@ -68,9 +78,11 @@ while True:
                 "start_xy": [kp_a["x"], kp_a["y"]],
                 "end_xy": [kp_b["x"], kp_b["y"]]
             })
+        profiler.lap("serialize")
 
         # Draw landmarks and connections on the frame
         mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+        profiler.lap("draw")
 
     # Append data for the current frame
     frame_data.append({
@@ -78,10 +90,14 @@ while True:
         "keypoints": keypoints,
         "edges": edges
     })
+    profiler.lap("serialize")
 
     # Display the frame
     cv2.imshow("Pose Estimation", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    key = cv2.waitKey(1) & 0xFF
+    profiler.lap("display")
+    profiler.end_frame()
+    if key == ord('q'):
         break
 
     frame_idx += 1
@@ -97,3 +113,9 @@ with open("poseg_data.json", "w") as f:
 
 print("Saved pose data to pose_data.json")
 
+# Save profiling summary
+profiler.close()
+profiler.write_summary(profile_summary_path)
+profiler.print_summary()
+print(f"Profiling summary saved to {profile_summary_path}")
+
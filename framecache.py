@@ -0,0 +1,147 @@
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from posecommon import file_digest
+
+# Decoded-frame cache for repeated runs over the same video.
+#
+# The first run decodes the video once, downscales it and converts BGR -> RGB,
+# and stores the frames as one raw uint8 file (frames, h, w, 3). Later runs
+# with the same video content and resize settings memory-map that file and
+# skip both H.264 decode and cvtColor. Entries are evicted least recently
+# used first once the cache grows past max_bytes.
+#
+#   cache = FrameCache("frame_cache", max_bytes=8 * 1024**3)
+#   video = cache.open("kannadu.mp4", resize_width=640)
+#   for frame_idx, frame_rgb in enumerate(video):
+#       results = pose.process(frame_rgb)
+
+INDEX_FILE = "index.json"
+
+
+class CachedVideo:
+    def __init__(self, frames, fps, source_size, key):
+        self.frames = frames            # np.memmap (n, h, w, 3) RGB, empty array if the video has no frames
+        self.fps = fps
+        self.source_size = source_size  # (width, height) of the original video
+        self.key = key
+
+    def __len__(self):
+        return self.frames.shape[0]
+
+    def __getitem__(self, idx):
+        return self.frames[idx]
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self.frames[idx]
+
+
+class FrameCache:
+    def __init__(self, cache_dir="frame_cache", max_bytes=8 * 1024**3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, "r") as f:
+            return json.load(f)
+
+    def _save_index(self, index):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def make_key(video_hash, resize_width=None):
+        return f"{video_hash}_w{resize_width or 'full'}"
+
+    def open(self, video_path, resize_width=None):
+        key = self.make_key(file_digest(video_path), resize_width)
+        index = self._load_index()
+        entry = index.get(key)
+        raw_path = os.path.join(self.cache_dir, key + ".rgb")
+
+        # Zero-frame entries saved by older versions can't be mapped either: decode them again
+        if entry is None or not entry["frames"] or not os.path.exists(raw_path):
+            index.pop(key, None)
+            entry = self._decode(video_path, raw_path, resize_width)
+            if entry["frames"] == 0:
+                # Nothing to map (an empty file can't be memory-mapped) and nothing worth caching
+                os.remove(raw_path)
+                self._save_index(index)
+                frames = np.empty((0, entry["height"], entry["width"], 3), dtype=np.uint8)
+                return CachedVideo(frames, entry["fps"], tuple(entry["source_size"]), key)
+            entry["source"] = os.path.basename(video_path)
+            index[key] = entry
+
+        entry["last_used"] = time.time()
+        self._evict(index, keep=key)
+        self._save_index(index)
+
+        frames = np.memmap(raw_path, dtype=np.uint8, mode="r",
+                           shape=(entry["frames"], entry["height"], entry["width"], 3))
+        return CachedVideo(frames, entry["fps"], tuple(entry["source_size"]), key)
+
+    def _decode(self, video_path, raw_path, resize_width):
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Could not open video file {video_path}.")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        src_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        src_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if resize_width and resize_width < src_w:
+            size = (resize_width, int(round(src_h * resize_width / src_w)))
+        else:
+            size = (src_w, src_h)
+
+        count = 0
+        tmp_path = raw_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if size != (frame.shape[1], frame.shape[0]):
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                f.write(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB).tobytes())
+                count += 1
+        cap.release()
+        os.replace(tmp_path, raw_path)
+
+        return {
+            "frames": count,
+            "width": size[0],
+            "height": size[1],
+            "fps": fps,
+            "source_size": [src_w, src_h],
+            "bytes": count * size[0] * size[1] * 3,
+        }
+
+    def _evict(self, index, keep=None):
+        total = sum(e["bytes"] for e in index.values())
+        for key in sorted(index, key=lambda k: index[k].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            raw_path = os.path.join(self.cache_dir, key + ".rgb")
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+            total -= index.pop(key)["bytes"]
+
+    def clear(self):
+        index = self._load_index()
+        for key in list(index):
+            raw_path = os.path.join(self.cache_dir, key + ".rgb")
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+        self._save_index({})
@@ -0,0 +1,214 @@
+import argparse
+import json
+from collections import deque
+
+import numpy as np
+
+from posecommon import NUM_LANDMARKS, arrays_to_pose_json, write_csv_rows
+
+# Visibility-aware gap filling for recorded or live landmarks.
+#
+# Landmarks below --min-visibility are treated as missing, like frames where
+# nobody was detected. Each landmark's gaps no longer than --max-gap seconds
+# are filled by linear interpolation (x, y, z and visibility) between the
+# observations on either side. Longer gaps, and gaps at the start or end of
+# the recording, stay NaN and are reported. The offline path does this for
+# all 33 landmarks of the whole recording at once with forward / backward
+# index scans, without a Python loop over frames.
+#
+# Scripts that write nothing for frames without a person
+# (veryimportantarcanglepose.py) can get those frames back first with
+# --fps, which inserts empty frames wherever the timestamps skip.
+#
+# OnlineGapFiller does the same for a live stream with a lookahead of a few
+# frames: output is delayed by `lookahead` frames, and gaps up to that length
+# are interpolated as soon as the landmark reappears. A gap whose first frame
+# has already been emitted as missing is left missing as a whole.
+#
+#   python gapfill.py pose_data.json --json pose_data_filled.json --gaps pose_gaps.csv
+#
+# Flags per frame and landmark: 0 observed, 1 filled, 2 missing (left as NaN).
+
+OBSERVED, FILLED, MISSING = 0, 1, 2
+GAP_CSV_FIELDS = ["landmark", "start_sec", "end_sec", "duration_sec", "frames"]
+
+
+def insert_missing_frames(timestamps, landmarks, fps):
+    # Adds all-NaN frames wherever consecutive timestamps are more than one frame apart
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if len(timestamps) < 2:
+        return timestamps, landmarks
+    dt = np.diff(timestamps)
+    missing = np.maximum(np.round(dt * fps).astype(np.int64) - 1, 0)
+    if not missing.any():
+        return timestamps, landmarks
+    counts = np.concatenate([missing + 1, [1]])
+    owner = np.repeat(np.arange(len(timestamps)), counts)
+    step = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    spacing = np.concatenate([dt / (missing + 1), [0.0]])
+    new_timestamps = np.round(timestamps[owner] + step * spacing[owner], 3)
+    new_landmarks = np.full((len(owner), NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    new_landmarks[step == 0] = landmarks
+    return new_timestamps, new_landmarks
+
+
+def mask_low_visibility(landmarks, min_visibility):
+    out = np.array(landmarks, dtype=np.float32, copy=True)
+    out[~(out[..., 3] >= min_visibility)] = np.nan
+    return out
+
+
+def fill_gaps(timestamps, landmarks, min_visibility=0.5, max_gap=0.5):
+    # -> filled landmarks (N, 33, 4), flags (N, 33)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    masked = mask_low_visibility(landmarks, min_visibility)
+    n = len(masked)
+    valid = ~np.isnan(masked[..., 0])  # (N, 33)
+    idx = np.arange(n)[:, None]
+
+    # Index of the previous / next observation of each landmark, -1 / n if none
+    prev = np.maximum.accumulate(np.where(valid, idx, -1), axis=0)
+    nxt = np.minimum.accumulate(np.where(valid, idx, n)[::-1], axis=0)[::-1]
+    bridged = ~valid & (prev >= 0) & (nxt < n)
+    prev_c = np.clip(prev, 0, n - 1)
+    next_c = np.clip(nxt, 0, n - 1)
+    span = timestamps[next_c] - timestamps[prev_c]
+    bridged &= span <= max_gap
+
+    cols = np.arange(NUM_LANDMARKS)[None, :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac = np.where(span > 0, (timestamps[:, None] - timestamps[prev_c]) / span, 0.0)
+    start = masked[prev_c, cols]
+    end = masked[next_c, cols]
+    interpolated = start + (end - start) * frac[..., None].astype(np.float32)
+
+    filled = np.where(bridged[..., None], interpolated, masked)
+    flags = np.full(valid.shape, MISSING, dtype=np.uint8)
+    flags[valid] = OBSERVED
+    flags[bridged] = FILLED
+    return filled, flags
+
+
+def gap_rows(timestamps, flags, names=None):
+    # One row per run of MISSING frames per landmark
+    rows = []
+    missing = flags == MISSING
+    edges = np.diff(np.concatenate([np.zeros((1, missing.shape[1]), np.int8), missing.view(np.int8),
+                                    np.zeros((1, missing.shape[1]), np.int8)]), axis=0)
+    for lm in range(missing.shape[1]):
+        starts = np.flatnonzero(edges[:, lm] == 1)
+        ends = np.flatnonzero(edges[:, lm] == -1)
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            rows.append({
+                "landmark": names[lm] if names else lm,
+                "start_sec": float(timestamps[s]),
+                "end_sec": float(timestamps[e - 1]),
+                "duration_sec": round(float(timestamps[e - 1] - timestamps[s]), 3),
+                "frames": e - s,
+            })
+    rows.sort(key=lambda row: (row["start_sec"], str(row["landmark"])))
+    return rows
+
+
+class OnlineGapFiller:
+    # push() frames as they come; frames come back `lookahead` frames later, with
+    # gaps of up to `lookahead` frames (and max_gap seconds) interpolated
+    def __init__(self, lookahead=3, min_visibility=0.5, max_gap=0.5):
+        self.lookahead = lookahead
+        self.min_visibility = min_visibility
+        self.max_gap = max_gap
+        self.pending = deque()  # [timestamp, landmarks (33, 4), flags (33,)]
+        self.last_value = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+        self.last_time = np.full(NUM_LANDMARKS, -np.inf)
+        self.emitted_time = -np.inf  # timestamp of the last frame handed back
+
+    def push(self, timestamp, landmarks=None):
+        # -> list of (timestamp, landmarks, flags) that are now final
+        if landmarks is None:
+            frame = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+        else:
+            frame = mask_low_visibility(landmarks, self.min_visibility)
+        valid = ~np.isnan(frame[:, 0])
+        flags = np.where(valid, OBSERVED, MISSING).astype(np.uint8)
+
+        # Landmarks that reappear close the gap in every pending frame after their last sighting,
+        # unless part of that gap has already gone out as MISSING
+        span = timestamp - self.last_time
+        closes = (valid & np.isfinite(self.last_time) & (span <= self.max_gap)
+                  & (self.last_time >= self.emitted_time))
+        if closes.any() and self.pending:
+            for entry in self.pending:
+                t, values, entry_flags = entry
+                todo = closes & (entry_flags == MISSING) & (t > self.last_time)
+                if todo.any():
+                    frac = ((t - self.last_time[todo]) / span[todo]).astype(np.float32)[:, None]
+                    values[todo] = self.last_value[todo] + (frame[todo] - self.last_value[todo]) * frac
+                    entry_flags[todo] = FILLED
+
+        self.last_value[valid] = frame[valid]
+        self.last_time[valid] = timestamp
+        self.pending.append([timestamp, frame, flags])
+        out = []
+        while len(self.pending) > self.lookahead:
+            out.append(tuple(self.pending.popleft()))
+        if out:
+            self.emitted_time = out[-1][0]
+        return out
+
+    def flush(self):
+        out = [tuple(entry) for entry in self.pending]
+        self.pending.clear()
+        if out:
+            self.emitted_time = out[-1][0]
+        return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill short landmark gaps and flag long ones")
+    parser.add_argument("recording", help="pose_data.json, multi-view .npz or wide joint CSV")
+    parser.add_argument("--time-key", default="timestamp_sec")
+    parser.add_argument("--min-visibility", type=float, default=0.5)
+    parser.add_argument("--max-gap", type=float, default=0.5, help="longest gap to fill (s)")
+    parser.add_argument("--fps", type=float, help="re-insert frames the capture skipped at this rate")
+    parser.add_argument("--json", help="write filled pose_data.json-style keypoints + edges")
+    parser.add_argument("--npz", help="write timestamps, landmarks and flags arrays")
+    parser.add_argument("--csv", help="write the joint CSV for frames with every landmark present")
+    parser.add_argument("--csv-layout", choices=["long", "wide"], default="long")
+    parser.add_argument("--gaps", help="write the unfilled gaps as CSV")
+    args = parser.parse_args()
+
+    from motionsegment import load_recording
+    from posecommon import LANDMARK_NAMES
+
+    timestamps, landmarks = load_recording(args.recording, args.time_key)
+    if args.fps:
+        timestamps, landmarks = insert_missing_frames(timestamps, landmarks, args.fps)
+    filled, flags = fill_gaps(timestamps, landmarks, args.min_visibility, args.max_gap)
+
+    total = flags.size
+    print(f"{len(timestamps)} frames: {np.mean(flags == OBSERVED):.1%} observed, "
+          f"{np.count_nonzero(flags == FILLED)} landmarks filled ({np.count_nonzero(flags == FILLED) / total:.1%}), "
+          f"{np.count_nonzero(flags == MISSING)} still missing")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(arrays_to_pose_json(timestamps, filled, args.time_key, with_edges=True), f, indent=2)
+        print(f"Filled pose data saved to {args.json}")
+    if args.npz:
+        np.savez_compressed(args.npz, timestamps=timestamps, landmarks=filled, flags=flags)
+        print(f"Arrays saved to {args.npz}")
+    if args.csv:
+        from bulkcsvwriter import JointCsvWriter
+
+        complete = (flags != MISSING).all(axis=1)
+        with JointCsvWriter(args.csv, layout=args.csv_layout) as writer:
+            writer.add_frames(timestamps[complete], filled[complete])
+        print(f"Joint data for {np.count_nonzero(complete)} complete frames saved to {args.csv}")
+    if args.gaps:
+        rows = gap_rows(timestamps, flags, LANDMARK_NAMES)
+        write_csv_rows(args.gaps, GAP_CSV_FIELDS, rows)
+        print(f"{len(rows)} unfilled gaps saved to {args.gaps}")
+
+
+if __name__ == "__main__":
+    main()
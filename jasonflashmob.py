@@ -2,6 +2,7 @@ import cv2
 import time
 import json
 import mediapipe as mp
+from poseprofiler import FrameProfiler
 
 # Initialize MediaPipe Pose (or any other pipeline you prefer)
 mp_pose = mp.solutions.pose
@@ -18,18 +19,27 @@ if not cap.isOpened():
 frame_data = []
 start_time = time.time()
 
+# Profiling (per-stage timings, summary written at exit)
+profile_summary_path = "video_frame_profile.json"
+profile_trace_path = None  # e.g. "video_frame_trace.jsonl" for per-frame timings
+profiler = FrameProfiler(profile_trace_path)
+
 print("Press 'q' to quit.")
 
 while True:
+    profiler.start_frame()
     ret, frame = cap.read()
     if not ret:
         print("Error: Failed to read frame from webcam.")
         break
+    profiler.lap("decode")
 
     # Convert the BGR image to RGB
     image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    profiler.lap("color")
     # Process with MediaPipe
     results = pose.process(image_rgb)
+    profiler.lap("inference")
 
     # Annotate frame (optional)
     annotated_frame = frame.copy()
@@ -38,6 +48,7 @@ while True:
             annotated_frame,
             results.pose_landmarks,
             mp_pose.POSE_CONNECTIONS)
+    profiler.lap("draw")
 
     # Calculate timestamp
     timestamp = time.time() - start_time
@@ -49,12 +60,16 @@ while True:
         "landmarks_count": len(results.pose_landmarks.landmark) if results.pose_landmarks else 0
     }
     frame_data.append(frame_info)
+    profiler.lap("serialize")
 
     # Display
     cv2.imshow('MediaPipe Live Pose', annotated_frame)
+    key = cv2.waitKey(1) & 0xFF
+    profiler.lap("display")
+    profiler.end_frame()
 
     # Exit on 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    if key == ord('q'):
         break
 
 # Cleanup
@@ -68,3 +83,9 @@ with open(output_filename, 'w') as f:
 
 print(f"Metadata saved to {output_filename}")
 
+# Save profiling summary
+profiler.close()
+profiler.write_summary(profile_summary_path)
+profiler.print_summary()
+print(f"Profiling summary saved to {profile_summary_path}")
+
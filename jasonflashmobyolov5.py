@@ -2,50 +2,107 @@ import cv2
 import time
 import json
 import mediapipe as mp
+from poseprofiler import FrameProfiler
+from framecache import FrameCache
+from landmarkcache import LandmarkCache
+from posecommon import landmarks_to_array
 
 # Initialize MediaPipe Pose
 mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(static_image_mode=False,
-                    model_complexity=1,
-                    enable_segmentation=False,
-                    min_detection_confidence=0.7,
-                    min_tracking_confidence=0.7)
+pose_settings = {
+    "static_image_mode": False,
+    "model_complexity": 1,
+    "enable_segmentation": False,
+    "min_detection_confidence": 0.7,
+    "min_tracking_confidence": 0.7,
+}
+pose = mp_pose.Pose(**pose_settings)
 mp_drawing = mp.solutions.drawing_utils
 connections = list(mp_pose.POSE_CONNECTIONS)
 
 # Open video file
 video_path = "kannadu.mp4"  # Replace with your video file path
-cap = cv2.VideoCapture(video_path)
-if not cap.isOpened():
-    raise RuntimeError("Could not open video file.")
 
-# Get video properties
-fps = cap.get(cv2.CAP_PROP_FPS)
-frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+# Optional decoded-frame cache: runs over the same video (parameter sweeps)
+# read downscaled RGB frames from a memory-mapped file instead of decoding
+frame_cache_dir = None  # e.g. "frame_cache"
+frame_cache_resize_width = 640
+show_preview = True  # drawing + window; needs a BGR copy when reading from the cache
+
+if frame_cache_dir:
+    cached_video = FrameCache(frame_cache_dir).open(video_path, resize_width=frame_cache_resize_width)
+    fps = cached_video.fps
+    frame_count = len(cached_video)
+    frame_width, frame_height = cached_video.source_size
+else:
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("Could not open video file.")
+
+    # Get video properties
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+# Optional landmark cache: raw results are stored per (video, pose_settings)
+# so landmarkcache.py can rebuild JSON/CSV/diffs later without inference.
+# Inference on downscaled cached frames is keyed separately from full resolution.
+landmark_cache_dir = None  # e.g. "landmark_cache"
+landmark_cache = None
+if landmark_cache_dir:
+    cache_settings = dict(pose_settings)
+    if frame_cache_dir and cached_video.frames.shape[2] != frame_width:
+        cache_settings["input_width"] = cached_video.frames.shape[2]
+    landmark_cache = LandmarkCache(landmark_cache_dir).entry(
+        video_path, cache_settings, frame_count, fps, (frame_width, frame_height))
 
 # Initialize data storage
 frame_data = []
 
+# Profiling (per-stage timings, summary written at exit)
+profile_summary_path = "pose_data_profile.json"
+profile_trace_path = None  # e.g. "pose_data_trace.jsonl" for per-frame timings
+profiler = FrameProfiler(profile_trace_path)
+
 print("Processing video. Press 'q' to quit.")
 
 frame_idx = 0
+reached_end = False
 while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+    profiler.start_frame()
+    if frame_cache_dir:
+        if frame_idx >= frame_count:
+            reached_end = True
+            break
+        frame_rgb = cached_video[frame_idx]
+        profiler.lap("decode")
+        frame = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR) if show_preview else None
+        profiler.lap("color")
+    else:
+        ret, frame = cap.read()
+        if not ret:
+            reached_end = True
+            break
+        profiler.lap("decode")
+
+        # Convert the BGR image to RGB before processing.
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        profiler.lap("color")
 
     # Calculate timestamp
     timestamp = round(frame_idx / fps, 3)
-
-    # Convert the BGR image to RGB before processing.
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     results = pose.process(frame_rgb)
+    profiler.lap("inference")
+    if landmark_cache is not None:
+        landmark_cache.put(frame_idx, landmarks_to_array(results.pose_landmarks))
 
     keypoints = []
     edges = []
 
     if results.pose_landmarks:
-        h, w = frame.shape[:2]
+        # Pixel coordinates always refer to the original video size
+        h, w = frame_height, frame_width
         # Extract keypoints
         for idx, lm in enumerate(results.pose_landmarks.landmark):
             keypoints.append({
@@ -66,9 +123,12 @@ while True:
                 "start_xy": [kp_a["x"], kp_a["y"]],
                 "end_xy": [kp_b["x"], kp_b["y"]]
             })
+        profiler.lap("serialize")
 
         # Draw landmarks and connections on the frame
-        mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+        if show_preview:
+            mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+            profiler.lap("draw")
 
     # Append data for the current frame
     frame_data.append({
@@ -76,16 +136,29 @@ while True:
         "keypoints": keypoints,
         "edges": edges
     })
+    profiler.lap("serialize")
 
     # Display the frame
-    cv2.imshow("Pose Estimation", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    key = None
+    if show_preview:
+        cv2.imshow("Pose Estimation", frame)
+        key = cv2.waitKey(1) & 0xFF
+        profiler.lap("display")
+    profiler.end_frame()
+    if key == ord('q'):
         break
 
     frame_idx += 1
 
+# Reached the end of the video: the landmark cache now covers every frame
+if landmark_cache is not None and reached_end:
+    landmark_cache.mark_complete(frame_idx)
+
 # Release resources
-cap.release()
+if not frame_cache_dir:
+    cap.release()
+if landmark_cache is not None:
+    landmark_cache.flush()
 cv2.destroyAllWindows()
 pose.close()
 
@@ -95,3 +168,9 @@ with open("pose_data.json", "w") as f:
 
 print("Saved pose data to pose_data.json")
 
+# Save profiling summary
+profiler.close()
+profiler.write_summary(profile_summary_path)
+profiler.print_summary()
+print(f"Profiling summary saved to {profile_summary_path}")
+
@@ -3,6 +3,7 @@ import time
 import json
 import torch
 import mediapipe as mp
+from poseprofiler import FrameProfiler
 
 # 1. Load YOLOv5 (person class only)
 model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True)
@@ -25,17 +26,25 @@ if not cap.isOpened():
 frame_data = []
 start_time = time.time()
 
+# Profiling (per-stage timings, summary written at exit)
+profile_summary_path = "multi_pose_profile.json"
+profile_trace_path = None  # e.g. "multi_pose_trace.jsonl" for per-frame timings
+profiler = FrameProfiler(profile_trace_path)
+
 print("Recording... Press Ctrl+C to stop and save metadata.")
 
 try:
     while True:
+        profiler.start_frame()
         ret, frame = cap.read()
         if not ret:
             break
+        profiler.lap("decode")
 
         timestamp = round(time.time() - start_time, 3)
         results = model(frame)
         detections = results.xyxy[0]
+        profiler.lap("detection")
 
         persons = []
         for idx, det in enumerate(detections.tolist()):
@@ -48,7 +57,9 @@ try:
             if crop.size == 0:
                 continue
             crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+            profiler.lap("color")
             mp_res = pose.process(crop_rgb)
+            profiler.lap("inference")
 
             # Collect keypoints and edges
             keypoints = []
@@ -82,11 +93,14 @@ try:
                 "keypoints": keypoints,
                 "edges": edges
             })
+            profiler.lap("serialize")
 
         frame_data.append({
             "timestamp_sec": timestamp,
             "persons": persons
         })
+        profiler.lap("serialize")
+        profiler.end_frame()
 
 except KeyboardInterrupt:
     print("Stopping recording...")
@@ -101,3 +115,9 @@ with open("multi_pose_data.json", "w") as f:
 
 print(f"Saved metadata for {len(frame_data)} frames to multi_pose_data.json")
 
+# Save profiling summary
+profiler.close()
+profiler.write_summary(profile_summary_path)
+profiler.print_summary()
+print(f"Profiling summary saved to {profile_summary_path}")
+
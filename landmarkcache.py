@@ -0,0 +1,252 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from bulkcsvwriter import JointCsvWriter
+from posecommon import (DEFAULT_POSE_SETTINGS, DIFF_CSV_FIELDS, NUM_LANDMARKS,
+                        arrays_to_pose_json, file_digest, landmarks_to_array,
+                        pose_diff_rows, to_pixels, write_csv_rows)
+
+# Landmark-result cache so analytics re-runs never repeat inference.
+#
+# Raw MediaPipe output is stored per (video content, Pose settings) as a
+# (frames, 33, 4) float32 array of normalized x, y, z, visibility, with a
+# per-frame "processed" flag. Frames where nobody was detected are processed
+# but all-NaN. Everything downstream (angles, joint CSV, 5 s diffs, playback
+# JSON) can be rebuilt from the cache without touching the video:
+#
+#   python landmarkcache.py kannadu.mp4 --model-complexity 1 \
+#       --json pose_data.json --csv pose_joint_data.csv --diff pose_diff_5s
+#
+# Frames missing from the cache are filled in by running Pose on them first.
+
+
+def settings_digest(pose_settings):
+    blob = json.dumps(pose_settings, sort_keys=True).encode()
+    return hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+class LandmarkCacheEntry:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        self._open()
+
+    def _open(self):
+        self.landmarks = np.load(os.path.join(self.path, "landmarks.npy"), mmap_mode="r+")
+        self.processed = np.load(os.path.join(self.path, "processed.npy"), mmap_mode="r+")
+
+    @classmethod
+    def create(cls, path, meta, capacity):
+        os.makedirs(path, exist_ok=True)
+        landmarks = np.lib.format.open_memmap(os.path.join(path, "landmarks.npy"), mode="w+",
+                                              dtype=np.float32,
+                                              shape=(capacity, NUM_LANDMARKS, 4))
+        landmarks[:] = np.nan
+        landmarks.flush()
+        processed = np.lib.format.open_memmap(os.path.join(path, "processed.npy"), mode="w+",
+                                              dtype=np.bool_, shape=(capacity,))
+        processed.flush()
+        del landmarks, processed
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        return cls(path)
+
+    def __len__(self):
+        return self.meta["frame_count"]
+
+    @property
+    def fps(self):
+        return self.meta["fps"]
+
+    @property
+    def frame_size(self):
+        return tuple(self.meta["frame_size"])
+
+    def _grow(self, capacity):
+        # CAP_PROP_FRAME_COUNT is only an estimate for some containers
+        old_landmarks = np.array(self.landmarks)
+        old_processed = np.array(self.processed)
+        del self.landmarks, self.processed
+        landmarks = np.lib.format.open_memmap(os.path.join(self.path, "landmarks.npy"), mode="w+",
+                                              dtype=np.float32,
+                                              shape=(capacity, NUM_LANDMARKS, 4))
+        landmarks[:] = np.nan
+        landmarks[:len(old_landmarks)] = old_landmarks
+        processed = np.lib.format.open_memmap(os.path.join(self.path, "processed.npy"), mode="w+",
+                                              dtype=np.bool_, shape=(capacity,))
+        processed[:len(old_processed)] = old_processed
+        landmarks.flush()
+        processed.flush()
+        del landmarks, processed
+        self._open()
+
+    def has(self, frame_idx):
+        return frame_idx < len(self.processed) and bool(self.processed[frame_idx])
+
+    def get(self, frame_idx):
+        # Normalized (33, 4) landmarks, or None if nobody was detected
+        frame = self.landmarks[frame_idx]
+        return None if np.isnan(frame[0, 0]) else np.array(frame)
+
+    def put(self, frame_idx, landmarks):
+        if frame_idx >= len(self.processed):
+            self._grow(max(frame_idx + 1, int(len(self.processed) * 1.25)))
+        if landmarks is not None:
+            self.landmarks[frame_idx] = landmarks
+        self.processed[frame_idx] = True
+        if frame_idx + 1 > self.meta["frame_count"]:
+            self.meta["frame_count"] = frame_idx + 1
+
+    def missing(self):
+        return np.flatnonzero(~np.asarray(self.processed[:len(self)]))
+
+    def is_complete(self):
+        return self.meta.get("complete", False) and not len(self.missing())
+
+    def mark_complete(self, frame_count):
+        self.meta["frame_count"] = frame_count
+        self.meta["complete"] = True
+        self.flush()
+
+    def flush(self):
+        self.landmarks.flush()
+        self.processed.flush()
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+    def timestamps(self):
+        return np.round(np.arange(len(self)) / self.fps, 3)
+
+    def pixel_landmarks(self):
+        # (frames, 33, 4) in pixel coordinates of the original video
+        width, height = self.frame_size
+        return to_pixels(self.landmarks[:len(self)], width, height)
+
+
+class LandmarkCache:
+    def __init__(self, cache_dir="landmark_cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_path(self, video_path, pose_settings):
+        key = f"{file_digest(video_path)}_{settings_digest(pose_settings)}"
+        return os.path.join(self.cache_dir, key)
+
+    def lookup(self, video_path, pose_settings):
+        path = self.entry_path(video_path, pose_settings)
+        if os.path.exists(os.path.join(path, "meta.json")):
+            return LandmarkCacheEntry(path)
+        return None
+
+    def entry(self, video_path, pose_settings, frame_count, fps, frame_size):
+        entry = self.lookup(video_path, pose_settings)
+        if entry is not None:
+            return entry
+        meta = {
+            "source": os.path.basename(video_path),
+            "video_hash": file_digest(video_path),
+            "pose_settings": pose_settings,
+            "frame_count": frame_count,
+            "fps": fps,
+            "frame_size": list(frame_size),
+            "complete": False,
+        }
+        return LandmarkCacheEntry.create(self.entry_path(video_path, pose_settings),
+                                         meta, max(frame_count, 1))
+
+    def ensure(self, video_path, pose_settings=None):
+        # Cached landmarks for the whole video, running Pose only on missing frames
+        pose_settings = dict(DEFAULT_POSE_SETTINGS, **(pose_settings or {}))
+        entry = self.lookup(video_path, pose_settings)
+        if entry is not None and entry.is_complete():
+            return entry
+
+        import cv2
+        import mediapipe as mp
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError("Could not open video file.")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        entry = self.entry(video_path, pose_settings,
+                           int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), fps, frame_size)
+
+        pose = mp.solutions.pose.Pose(**pose_settings)
+        frame_idx = 0
+        while True:
+            if entry.has(frame_idx):
+                # Frames we already have are still decoded by grab(); only retrieve(), the
+                # colour conversion and inference are skipped
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                entry.put(frame_idx, landmarks_to_array(results.pose_landmarks))
+            frame_idx += 1
+        cap.release()
+        pose.close()
+        entry.mark_complete(frame_idx)
+        return entry
+
+
+def export_entry(entry, json_path=None, csv_path=None, diff_prefix=None, window=5.0,
+                 csv_layout="long"):
+    timestamps = entry.timestamps()
+    landmarks = entry.pixel_landmarks()
+
+    if csv_path:
+        with JointCsvWriter(csv_path, layout=csv_layout) as writer:
+            writer.add_frames(timestamps, landmarks)
+        print(f"Joint data saved to {csv_path}")
+
+    if json_path or diff_prefix:
+        pose_data = arrays_to_pose_json(timestamps, landmarks, with_edges=True)
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump(pose_data, f, indent=2)
+            print(f"Pose data saved to {json_path}")
+        if diff_prefix:
+            csv_rows, json_output = pose_diff_rows(pose_data, window)
+            write_csv_rows(diff_prefix + ".csv", DIFF_CSV_FIELDS, csv_rows)
+            with open(diff_prefix + ".json", "w") as f:
+                json.dump(json_output, f, indent=2)
+            print(f"Pose changes saved to {diff_prefix}.csv and {diff_prefix}.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild pose outputs from cached landmarks")
+    parser.add_argument("video")
+    parser.add_argument("--cache-dir", default="landmark_cache")
+    parser.add_argument("--model-complexity", type=int, default=DEFAULT_POSE_SETTINGS["model_complexity"])
+    parser.add_argument("--min-detection-confidence", type=float,
+                        default=DEFAULT_POSE_SETTINGS["min_detection_confidence"])
+    parser.add_argument("--min-tracking-confidence", type=float,
+                        default=DEFAULT_POSE_SETTINGS["min_tracking_confidence"])
+    parser.add_argument("--json", help="write pose_data.json-style keypoints + edges")
+    parser.add_argument("--csv", help="write the long joint CSV with angles")
+    parser.add_argument("--csv-layout", choices=["long", "wide"], default="long")
+    parser.add_argument("--diff", help="write <prefix>.csv/.json displacement tables")
+    parser.add_argument("--window", type=float, default=5.0, help="diff window in seconds")
+    args = parser.parse_args()
+
+    settings = {
+        "model_complexity": args.model_complexity,
+        "min_detection_confidence": args.min_detection_confidence,
+        "min_tracking_confidence": args.min_tracking_confidence,
+    }
+    entry = LandmarkCache(args.cache_dir).ensure(args.video, settings)
+    print(f"{len(entry)} frames cached in {entry.path}")
+    export_entry(entry, args.json, args.csv, args.diff, args.window, args.csv_layout)
+
+
+if __name__ == "__main__":
+    main()
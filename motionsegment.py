@@ -0,0 +1,216 @@
+import argparse
+import json
+
+import numpy as np
+
+from bulkcsvwriter import read_wide_csv
+from posecommon import (JOINT_SETS, arrays_to_pose_json, joint_angles, load_pose_json,
+                        pose_json_to_arrays, write_csv_rows)
+
+# Motion segmentation and keyframe extraction over whole recordings.
+#
+# Instead of sampling every 5 s regardless of what the performer does, each
+# frame gets a motion energy: the mean landmark speed (visible landmarks only)
+# divided by the torso length, i.e. body lengths per second, so it doesn't
+# depend on camera distance or on pixel vs normalized coordinates. The energy
+# is smoothed and split with hysteresis: a still pose starts when it drops
+# below --still and only ends when it rises above --move. Still poses shorter
+# than --min-still are folded into the surrounding movement. Every step is a
+# single vectorized pass, so the cost is linear in the number of frames.
+#
+# Each segment gets a keyframe: the most settled frame of a still pose, the
+# peak of a movement.
+#
+#   python motionsegment.py pose_data.json --segments pose_segments.csv \
+#       --keyframes pose_keyframes.json --energy pose_energy.csv
+#
+# Input: pose_data.json style JSON, an .npz with timestamps + landmarks
+# (multicamcapture.py, first view) or a wide joint CSV.
+
+SEGMENT_CSV_FIELDS = ["segment", "kind", "start_sec", "end_sec", "duration_sec", "start_frame",
+                      "end_frame", "mean_energy", "peak_energy", "keyframe_sec", "keyframe_frame"]
+SHOULDERS = (11, 12)
+HIPS = (23, 24)
+STILL, MOVING, MISSING = 0, 1, 2
+KIND_NAMES = {STILL: "still", MOVING: "moving", MISSING: "missing"}
+
+
+def load_recording(path, time_key="timestamp_sec"):
+    # -> timestamps (N,), landmarks (N, 33, 4) with NaN rows for empty frames
+    if path.endswith(".npz"):
+        data = np.load(path)
+        landmarks = data["landmarks"]
+        if landmarks.ndim == 4:
+            landmarks = landmarks[:, 0]
+        return data["timestamps"], landmarks
+    if path.endswith(".posez"):
+        from posecodec import read_recording
+
+        return read_recording(path)
+    if path.endswith(".csv"):
+        timestamps, xy, _ = read_wide_csv(path)
+        landmarks = np.concatenate([xy, np.zeros_like(xy[..., :1]), np.ones_like(xy[..., :1])], axis=-1)
+        return timestamps, landmarks
+    return pose_json_to_arrays(load_pose_json(path), time_key)
+
+
+def moving_average(values, window):
+    # Centered moving average ignoring NaN; NaN where the whole window is NaN
+    if window <= 1:
+        return values
+    valid = ~np.isnan(values)
+    pad = window // 2
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    idx = np.arange(len(values))
+    lo = np.clip(idx - pad, 0, len(values))
+    hi = np.clip(idx + window - pad, 0, len(values))
+    n = counts[hi] - counts[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (sums[hi] - sums[lo]) / n, np.nan)
+
+
+def nanmean(values, axis):
+    # np.nanmean without the all-NaN warning
+    valid = ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(valid, values, 0.0).sum(axis=axis) / valid.sum(axis=axis)
+
+
+def motion_energy(timestamps, landmarks, min_visibility=0.5, smooth=5):
+    # Per-frame energy in torso lengths per second (NaN where nobody was tracked)
+    xy = np.asarray(landmarks[..., :2], dtype=np.float64)
+    vis = np.asarray(landmarks[..., 3], dtype=np.float64)
+    xy = np.where((vis >= min_visibility)[..., None], xy, np.nan)
+
+    shoulders = nanmean(xy[:, SHOULDERS], axis=1)
+    hips = nanmean(xy[:, HIPS], axis=1)
+    torso = np.linalg.norm(shoulders - hips, axis=-1)
+    scale = np.nanmedian(torso) if np.isfinite(torso).any() else 1.0
+    torso = np.where(np.isfinite(torso) & (torso > 0), torso, scale)
+
+    dt = np.diff(np.asarray(timestamps, dtype=np.float64))
+    dt[dt <= 0] = np.nan
+    speed = np.linalg.norm(np.diff(xy, axis=0), axis=-1) / dt[:, None]  # (N-1, 33)
+    energy = np.concatenate([[np.nan], nanmean(speed, axis=1) / torso[1:]])[:len(timestamps)]
+    return moving_average(energy, smooth)
+
+
+def hysteresis(energy, still, move):
+    # STILL below `still`, MOVING above `move`, in between keep the previous state
+    state = np.full(len(energy), -1, dtype=np.int8)
+    state[energy <= still] = STILL
+    state[energy >= move] = MOVING
+    decided = state >= 0
+    last = np.maximum.accumulate(np.where(decided, np.arange(len(energy)), 0))
+    out = np.where(decided[last], state[last], MOVING).astype(np.int8)
+    out[np.isnan(energy)] = MISSING
+    return out
+
+
+def runs(labels):
+    # Run-length encode -> starts, ends (exclusive), values
+    if len(labels) == 0:
+        return np.empty(0, int), np.empty(0, int), labels
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(labels)) + 1])
+    ends = np.concatenate([starts[1:], [len(labels)]])
+    return starts, ends, labels[starts]
+
+
+def drop_short_still(labels, timestamps, min_still):
+    # Still runs shorter than min_still seconds become movement
+    starts, ends, values = runs(labels)
+    durations = timestamps[ends - 1] - timestamps[starts]
+    short = (values == STILL) & (durations < min_still)
+    if short.any():
+        mask = np.repeat(short, ends - starts)
+        labels = labels.copy()
+        labels[mask] = MOVING
+    return labels
+
+
+def segment(timestamps, energy, still=0.15, move=0.35, min_still=0.5):
+    # -> per-frame labels and a list of segment dicts with keyframes
+    labels = drop_short_still(hysteresis(energy, still, move), timestamps, min_still)
+    starts, ends, values = runs(labels)
+    filled = np.where(np.isnan(energy), np.inf, energy)
+    peaks = np.where(np.isnan(energy), -np.inf, energy)
+    segments = []
+    for i, (start, end, value) in enumerate(zip(starts.tolist(), ends.tolist(), values.tolist())):
+        window = energy[start:end]
+        if value == STILL:
+            key = start + int(np.argmin(filled[start:end]))
+        elif value == MOVING:
+            key = start + int(np.argmax(peaks[start:end]))
+        else:
+            key = None
+        has_energy = value != MISSING and not np.isnan(window).all()
+        segments.append({
+            "segment": i,
+            "kind": KIND_NAMES[value],
+            "start_sec": round(float(timestamps[start]), 3),
+            "end_sec": round(float(timestamps[end - 1]), 3),
+            "duration_sec": round(float(timestamps[end - 1] - timestamps[start]), 3),
+            "start_frame": start,
+            "end_frame": end - 1,
+            "mean_energy": round(float(np.nanmean(window)), 4) if has_energy else "",
+            "peak_energy": round(float(np.nanmax(window)), 4) if has_energy else "",
+            "keyframe_sec": round(float(timestamps[key]), 3) if key is not None else "",
+            "keyframe_frame": key if key is not None else "",
+        })
+    return labels, segments
+
+
+def keyframe_json(timestamps, landmarks, segments, time_key="timestamp_sec"):
+    # pose_data.json style frames for each keyframe, tagged with its segment
+    picked = [s for s in segments if s["keyframe_frame"] != ""]
+    idx = np.array([s["keyframe_frame"] for s in picked], dtype=int)
+    frames = arrays_to_pose_json(timestamps[idx], landmarks[idx], time_key)
+    angles = joint_angles(landmarks[idx]) if len(idx) else []
+    for frame, seg, frame_angles in zip(frames, picked, angles):
+        frame["segment"] = seg["segment"]
+        frame["kind"] = seg["kind"]
+        frame["angles"] = {name: float(a) for name, a in zip(JOINT_SETS, frame_angles) if a == a}
+    return frames
+
+
+def write_energy_csv(path, timestamps, energy, labels):
+    with open(path, "w", newline="") as f:
+        f.write("timestamp_sec,energy,state\n")
+        for ts, e, label in zip(timestamps.tolist(), energy.tolist(), labels.tolist()):
+            f.write(f"{ts},{'' if e != e else round(e, 4)},{KIND_NAMES[label]}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Segment a pose recording into still poses and movements")
+    parser.add_argument("recording", help="pose_data.json, multi-view .npz or wide joint CSV")
+    parser.add_argument("--time-key", default="timestamp_sec")
+    parser.add_argument("--still", type=float, default=0.15, help="enter still below (torso lengths/s)")
+    parser.add_argument("--move", type=float, default=0.35, help="leave still above (torso lengths/s)")
+    parser.add_argument("--min-still", type=float, default=0.5, help="shortest still pose (s)")
+    parser.add_argument("--smooth", type=int, default=5, help="moving-average window (frames)")
+    parser.add_argument("--min-visibility", type=float, default=0.5)
+    parser.add_argument("--segments", default="pose_segments.csv")
+    parser.add_argument("--keyframes", default="pose_keyframes.json")
+    parser.add_argument("--energy", help="also write per-frame energy and state")
+    args = parser.parse_args()
+
+    timestamps, landmarks = load_recording(args.recording, args.time_key)
+    energy = motion_energy(timestamps, landmarks, args.min_visibility, args.smooth)
+    labels, segments = segment(timestamps, energy, args.still, args.move, args.min_still)
+
+    write_csv_rows(args.segments, SEGMENT_CSV_FIELDS, segments)
+    keyframes = keyframe_json(timestamps, landmarks, segments, args.time_key)
+    with open(args.keyframes, "w") as f:
+        json.dump(keyframes, f, indent=2)
+    if args.energy:
+        write_energy_csv(args.energy, timestamps, energy, labels)
+
+    counts = {kind: sum(1 for s in segments if s["kind"] == kind) for kind in KIND_NAMES.values()}
+    print(f"{len(timestamps)} frames -> {counts['still']} still poses, {counts['moving']} movements, "
+          f"{counts['missing']} gaps; {len(keyframes)} keyframes")
+    print(f"Segments saved to {args.segments}, keyframes to {args.keyframes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from posecommon import DEFAULT_POSE_SETTINGS, NUM_LANDMARKS, landmarks_to_array, to_pixels
+
+# Asynchronous multi-camera capture with a unified timeline.
+#
+# Every source (webcam index or video file) gets its own grabber and its own
+# Pose instance. The blocking cap.read() + pose.process() run on a thread
+# pool (both release the GIL), driven by one asyncio task per source. Frames
+# are stamped against one shared monotonic clock and an aligner task merges
+# the per-camera queues into time-aligned sets:
+#
+#   python multicamcapture.py 0 1 2 --out multi_view.npz
+#   python multicamcapture.py front.mp4 side.mp4 --out multi_view.npz
+#
+# Video files stand in for cameras: their frames are stamped at
+# start + frame_idx / fps (optionally paced in real time), so runs over the
+# same files line up deterministically.
+
+
+def mediapipe_estimator(pose_settings=None):
+    # Returns a frame_rgb -> normalized (33, 4) or None callable with its own graph
+    import mediapipe as mp
+
+    pose = mp.solutions.pose.Pose(**dict(DEFAULT_POSE_SETTINGS, **(pose_settings or {})))
+
+    def estimate(frame_rgb):
+        return landmarks_to_array(pose.process(frame_rgb).pose_landmarks)
+
+    estimate.close = pose.close
+    return estimate
+
+
+class CameraSource:
+    def __init__(self, name, source, estimator_factory=mediapipe_estimator, realtime=None):
+        self.name = name
+        self.source = int(source) if str(source).isdigit() else source
+        self.is_file = not isinstance(self.source, int)
+        # Files are paced to their own fps by default only when mixed with cameras
+        self.realtime = realtime
+        self.estimator_factory = estimator_factory
+        self.cap = None
+        self.estimate = None
+        self.fps = 0.0
+        self.frame_idx = 0
+        self.frame_size = (0, 0)
+
+    def open(self):
+        import cv2
+
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open source {self.source!r}.")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.estimate = self.estimator_factory()
+
+    def read(self, clock_start_ns):
+        # Blocking: grab, convert, infer. Returns (t_ns, landmarks_px) or None at EOF
+        import cv2
+
+        if self.is_file:
+            t_ns = clock_start_ns + int(self.frame_idx / self.fps * 1e9)
+            if self.realtime:
+                delay = (t_ns - time.monotonic_ns()) / 1e9
+                if delay > 0:
+                    time.sleep(delay)
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        if not self.is_file:
+            t_ns = time.monotonic_ns()
+        self.frame_idx += 1
+        h, w = frame.shape[:2]
+        landmarks = self.estimate(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if landmarks is not None:
+            landmarks = to_pixels(landmarks, w, h)
+        return t_ns, landmarks
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+        if self.estimate is not None and hasattr(self.estimate, "close"):
+            self.estimate.close()
+
+
+class MultiCameraService:
+    def __init__(self, sources, tolerance_ms=20.0, queue_size=64):
+        self.sources = sources
+        self.names = [s.name for s in sources]
+        self.tolerance_ns = int(tolerance_ms * 1e6)
+        self.queue_size = queue_size
+        self.clock_start_ns = None
+        self.dropped = {name: 0 for name in self.names}
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    async def _grab_loop(self, source, queue, executor):
+        loop = asyncio.get_running_loop()
+        try:
+            while not self._stop.is_set():
+                item = await loop.run_in_executor(executor, source.read, self.clock_start_ns)
+                if item is None:
+                    break
+                if source.is_file and not source.realtime:
+                    # Unpaced files just wait for the aligner
+                    await queue.put(item)
+                    continue
+                if queue.full():
+                    # Never stall a live grabber behind a slow consumer: drop the oldest frame
+                    queue.get_nowait()
+                    self.dropped[source.name] += 1
+                queue.put_nowait(item)
+        finally:
+            await queue.put(None)
+
+    async def frames(self):
+        # Async generator of (t_sec, {name: (t_sec, landmarks_px or None)})
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=len(self.sources))
+        await asyncio.gather(*(loop.run_in_executor(executor, s.open) for s in self.sources))
+        for s in self.sources:
+            if s.realtime is None:
+                s.realtime = not all(x.is_file for x in self.sources)
+        self.clock_start_ns = time.monotonic_ns()
+
+        queues = {s.name: asyncio.Queue(self.queue_size) for s in self.sources}
+        tasks = [asyncio.create_task(self._grab_loop(s, queues[s.name], executor))
+                 for s in self.sources]
+        pending = {name: deque() for name in self.names}
+        finished = set()
+        try:
+            while len(finished) < len(self.names):
+                # Top up every camera that has nothing buffered
+                for name in self.names:
+                    while name not in finished and not pending[name]:
+                        item = await queues[name].get()
+                        if item is None:
+                            finished.add(name)
+                        else:
+                            pending[name].append(item)
+                    while not queues[name].empty():
+                        item = queues[name].get_nowait()
+                        if item is None:
+                            finished.add(name)
+                        else:
+                            pending[name].append(item)
+                if any(not pending[name] for name in self.names):
+                    break
+
+                merged = self._align(pending)
+                if merged is not None:
+                    yield merged
+        finally:
+            self._stop.set()
+            for q in queues.values():
+                while not q.empty():
+                    q.get_nowait()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for s in self.sources:
+                s.close()
+            executor.shutdown(wait=False)
+
+    def _align(self, pending):
+        # All heads are >= the earliest one, so each view's head is its best match
+        heads = {name: pending[name][0][0] for name in self.names}
+        ref_name = min(heads, key=heads.get)
+        ref_t = heads[ref_name]
+        latest = max(heads.values())
+        ref_buf = pending[ref_name]
+        spread = latest - ref_t
+        if spread > self.tolerance_ns or (len(ref_buf) > 1 and abs(ref_buf[1][0] - latest) < spread):
+            # Reference frame has no partner (or its successor is a better one)
+            ref_buf.popleft()
+            self.dropped[ref_name] += 1
+            return None
+
+        merged = {}
+        for name in self.names:
+            t_ns, landmarks = pending[name].popleft()
+            merged[name] = ((t_ns - self.clock_start_ns) / 1e9, landmarks)
+        return round((ref_t - self.clock_start_ns) / 1e9, 3), merged
+
+
+def save_merged(path, names, merged_frames):
+    # (N,), (N, V), (N, V, 33, 4) with NaN for views that saw nobody
+    n, v = len(merged_frames), len(names)
+    timestamps = np.empty(n, dtype=np.float64)
+    view_timestamps = np.empty((n, v), dtype=np.float64)
+    landmarks = np.full((n, v, NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    for i, (t, views) in enumerate(merged_frames):
+        timestamps[i] = t
+        for j, name in enumerate(names):
+            view_t, lm = views[name]
+            view_timestamps[i, j] = view_t
+            if lm is not None:
+                landmarks[i, j] = lm
+    np.savez_compressed(path, names=np.array(names), timestamps=timestamps,
+                        view_timestamps=view_timestamps, landmarks=landmarks)
+
+
+async def record(service, out_path, merged_frames, max_seconds=None):
+    # Saves whatever was merged, also when cancelled by Ctrl+C
+    try:
+        async for t, views in service.frames():
+            merged_frames.append((t, views))
+            if max_seconds is not None and t >= max_seconds:
+                break
+    finally:
+        save_merged(out_path, service.names, merged_frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synchronized multi-camera pose capture")
+    parser.add_argument("sources", nargs="+", help="webcam indices or video files")
+    parser.add_argument("--out", default="multi_view.npz")
+    parser.add_argument("--tolerance-ms", type=float, default=20.0,
+                        help="max time difference between views in one merged frame")
+    parser.add_argument("--seconds", type=float, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    sources = [CameraSource(f"cam{i}", src) for i, src in enumerate(args.sources)]
+    service = MultiCameraService(sources, tolerance_ms=args.tolerance_ms)
+    merged_frames = []
+    print("Recording... Press Ctrl+C to stop and save.")
+    try:
+        asyncio.run(record(service, args.out, merged_frames, args.seconds))
+    except KeyboardInterrupt:
+        print("Stopping recording...")
+    print(f"Saved {len(merged_frames)} aligned frames from {len(sources)} views to {args.out}")
+    print(f"Dropped frames per view: {service.dropped}")
+
+
+if __name__ == "__main__":
+    main()
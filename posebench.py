@@ -0,0 +1,246 @@
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bulkcsvwriter import JointCsvWriter, read_wide_csv
+from posecommon import (JOINT_SETS, JOINT_CSV_FIELDS, LANDMARK_NAMES, NUM_LANDMARKS,
+                        POSE_CONNECTIONS, arrays_to_pose_json, calculate_angle,
+                        joint_angle_diff_rows, joint_angles, load_pose_json,
+                        pose_diff_rows, read_joint_angles)
+
+# Benchmarks for the post-processing paths (angles, 5 s diffs, angle deltas,
+# serialization, playback rendering) over synthetic landmark streams and the
+# checked-in recordings. Needs no camera, GPU or network; cv2 is optional and
+# only used for the rendering benchmark.
+#
+#   python posebench.py --frames 3000 --persons 2 --output bench_results.json
+
+RECORDED_JSON = "pose_data_webcam.json"
+RECORDED_CSV = "pose_joint_data.csv"
+RECORDED_DIFF_CSV = "pose_diff_5s_webcam.csv"
+
+
+def synthetic_stream(frames, persons=1, fps=30.0, width=640, height=480, seed=0):
+    # Random-walk landmarks: (frames, persons, 33, 4) plus timestamps
+    rng = np.random.default_rng(seed)
+    base = np.empty((persons, NUM_LANDMARKS, 4), dtype=np.float32)
+    base[..., 0] = rng.uniform(0.2 * width, 0.8 * width, (persons, NUM_LANDMARKS))
+    base[..., 1] = rng.uniform(0.2 * height, 0.8 * height, (persons, NUM_LANDMARKS))
+    base[..., 2] = rng.uniform(-0.6, 0.1, (persons, NUM_LANDMARKS))
+    base[..., 3] = 1.0
+    steps = rng.normal(0.0, 1.5, (frames, persons, NUM_LANDMARKS, 3)).astype(np.float32)
+    steps[..., 2] *= 0.002
+    landmarks = np.repeat(base[None], frames, axis=0)
+    landmarks[..., :3] += np.cumsum(steps, axis=0)
+    landmarks[..., 0] = np.clip(landmarks[..., 0], 0, width - 1)
+    landmarks[..., 1] = np.clip(landmarks[..., 1], 0, height - 1)
+    timestamps = np.round(np.arange(frames) / fps, 3)
+    return timestamps, landmarks
+
+
+def timed(fn, repeat):
+    # Run fn repeat times, return (seconds per run, last result)
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def describe(name, times, items, unit):
+    best = min(times)
+    return {
+        "name": name,
+        "runs": len(times),
+        "items": items,
+        "unit": unit,
+        "min_sec": round(best, 6),
+        "median_sec": round(statistics.median(times), 6),
+        "mean_sec": round(statistics.mean(times), 6),
+        "items_per_sec": round(items / best, 1) if best > 0 else None,
+    }
+
+
+def angles_scalar(landmarks):
+    # What the capture scripts do per frame: dict of int pixel coords + calculate_angle
+    out = []
+    for frame in landmarks.reshape(-1, NUM_LANDMARKS, 4).tolist():
+        lm_dict = {idx: (int(x), int(y)) for idx, (x, y, _, _) in enumerate(frame)}
+        out.append([calculate_angle(lm_dict[a], lm_dict[b], lm_dict[c])
+                    for a, b, c in JOINT_SETS.values()])
+    return out
+
+
+def joint_csv_long(timestamps, landmarks):
+    # Long joint CSV exactly as the capture scripts write it, one DictWriter row per value
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=JOINT_CSV_FIELDS)
+    writer.writeheader()
+    angles = joint_angles(landmarks)
+    for ts, frame, frame_angles in zip(timestamps.tolist(), landmarks.tolist(), angles.tolist()):
+        for idx, (x, y, _, _) in enumerate(frame):
+            writer.writerow({"timestamp_sec": ts, "joint": LANDMARK_NAMES[idx],
+                             "x": int(x), "y": int(y), "angle_deg": ""})
+        for (name, (_, b, _)), angle in zip(JOINT_SETS.items(), frame_angles):
+            writer.writerow({"timestamp_sec": ts, "joint": name,
+                             "x": int(frame[b][0]), "y": int(frame[b][1]), "angle_deg": angle})
+    return buf.getvalue()
+
+
+def joint_csv_bulk(timestamps, landmarks, path, layout):
+    with JointCsvWriter(path, layout=layout) as writer:
+        for ts, frame in zip(timestamps.tolist(), landmarks):
+            writer.add_frame(ts, frame)
+    return os.path.getsize(path)
+
+
+def render_playback(frames, width, height):
+    import cv2
+
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    for frame_info in frames:
+        canvas[:] = 0
+        keypoints = frame_info["keypoints"]
+        if not keypoints:
+            continue
+        for a, b in POSE_CONNECTIONS:
+            kp_a, kp_b = keypoints[a], keypoints[b]
+            cv2.line(canvas, (int(kp_a["x"]), int(kp_a["y"])),
+                     (int(kp_b["x"]), int(kp_b["y"])), (255, 0, 0), 2)
+        for kp in keypoints:
+            cv2.circle(canvas, (int(kp["x"]), int(kp["y"])), 3, (0, 255, 0), -1)
+    return len(frames)
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(frames, persons, repeat, data_dir=".", render=True):
+    results = []
+    timestamps, stream = synthetic_stream(frames, persons)
+    flat = stream.reshape(-1, NUM_LANDMARKS, 4)
+    per_person_ts = np.repeat(timestamps, persons)
+    n_frames = flat.shape[0]
+
+    # --- Angles ---
+    times, _ = timed(lambda: angles_scalar(flat), repeat)
+    results.append(describe("angles_scalar_synthetic", times, n_frames, "frames"))
+    times, _ = timed(lambda: joint_angles(flat), repeat)
+    results.append(describe("angles_vectorized_synthetic", times, n_frames, "frames"))
+
+    # --- 5 s diffs over the keypoint JSON form ---
+    synthetic_json = arrays_to_pose_json(timestamps, stream[:, 0])
+    times, (rows, _) = timed(lambda: pose_diff_rows(synthetic_json), repeat)
+    results.append(describe("diff_5s_synthetic", times, len(synthetic_json), "frames"))
+
+    # --- Serialization ---
+    times, text = timed(lambda: joint_csv_long(per_person_ts, flat), repeat)
+    results.append(describe("csv_long_dictwriter_synthetic", times, n_frames, "frames"))
+    results[-1]["bytes"] = len(text)
+    for layout in ("long", "wide"):
+        path = os.path.join(tempfile.gettempdir(), f"posebench_{layout}.csv")
+        times, size = timed(lambda: joint_csv_bulk(per_person_ts, flat, path, layout), repeat)
+        results.append(describe(f"csv_{layout}_bulk_synthetic", times, n_frames, "frames"))
+        results[-1]["bytes"] = size
+        if layout == "wide":
+            times, _ = timed(lambda: read_wide_csv(path), repeat)
+            results.append(describe("csv_wide_read_synthetic", times, n_frames, "frames"))
+        os.remove(path)
+    times, text = timed(lambda: json.dumps(synthetic_json, indent=2), repeat)
+    results.append(describe("json_indent_synthetic", times, len(synthetic_json), "frames"))
+    results[-1]["bytes"] = len(text)
+    times, text = timed(lambda: json.dumps(synthetic_json, separators=(",", ":")), repeat)
+    results.append(describe("json_compact_synthetic", times, len(synthetic_json), "frames"))
+    results[-1]["bytes"] = len(text)
+    times, blob = timed(lambda: flat.tobytes(), repeat)
+    results.append(describe("numpy_raw_synthetic", times, n_frames, "frames"))
+    results[-1]["bytes"] = len(blob)
+
+    # --- Checked-in recordings ---
+    json_path = os.path.join(data_dir, RECORDED_JSON)
+    if os.path.exists(json_path):
+        times, recorded = timed(lambda: load_pose_json(json_path), repeat)
+        results.append(describe("json_load_recorded", times, len(recorded), "frames"))
+        times, _ = timed(lambda: pose_diff_rows(recorded), repeat)
+        results.append(describe("diff_5s_recorded", times, len(recorded), "frames"))
+        if render:
+            try:
+                times, _ = timed(lambda: render_playback(recorded, 640, 480), repeat)
+                results.append(describe("playback_render_recorded", times, len(recorded), "frames"))
+            except ImportError:
+                print("cv2 not available, skipping playback rendering benchmark")
+
+    csv_path = os.path.join(data_dir, RECORDED_CSV)
+    if os.path.exists(csv_path):
+        def load_rows():
+            with open(csv_path, newline='') as f:
+                return list(csv.DictReader(f))
+
+        times, rows = timed(load_rows, repeat)
+        results.append(describe("csv_read_recorded", times, len(rows), "rows"))
+        times, angle_data = timed(lambda: read_joint_angles(rows), repeat)
+        results.append(describe("angle_parse_recorded", times, len(rows), "rows"))
+        times, _ = timed(lambda: joint_angle_diff_rows(angle_data), repeat)
+        results.append(describe("angle_diff_5s_recorded", times, len(angle_data), "timestamps"))
+
+    diff_csv_path = os.path.join(data_dir, RECORDED_DIFF_CSV)
+    if os.path.exists(diff_csv_path):
+        def load_diff_rows():
+            with open(diff_csv_path, newline='') as f:
+                return list(csv.DictReader(f))
+
+        times, rows = timed(load_diff_rows, repeat)
+        results.append(describe("diff_csv_read_recorded", times, len(rows), "rows"))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pose post-processing paths")
+    parser.add_argument("--frames", type=int, default=3000, help="synthetic frames per person")
+    parser.add_argument("--persons", type=int, default=1, help="synthetic persons per frame")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark")
+    parser.add_argument("--data-dir", default=".", help="directory with the recorded data")
+    parser.add_argument("--no-render", action="store_true", help="skip the cv2 playback benchmark")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.frames, args.persons, args.repeat, args.data_dir,
+                             render=not args.no_render)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "params": {"frames": args.frames, "persons": args.persons, "repeat": args.repeat},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for r in results:
+        print(f"{r['name']:<32}{r['min_sec'] * 1000:>10.2f} ms{r['items_per_sec'] or 0:>14.1f} {r['unit']}/s")
+    print(f"Benchmark results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
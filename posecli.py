@@ -0,0 +1,245 @@
+import sys
+import time
+
+CLI_STARTED = time.perf_counter()
+
+import argparse
+import importlib
+import os
+import runpy
+import threading
+
+# Single entry point for the pose tools.
+#
+# Only the standard library is imported up front; each subcommand imports
+# what it needs (cv2, mediapipe, numpy, ...) when it runs, so post-processing
+# commands start instantly and capture doesn't pay for modules it never uses.
+#
+#   python posecli.py capture --source 0 --csv pose_joint_data_webcam.csv
+#   python posecli.py run everyjointangleexport
+#   python posecli.py ingest --dir takes/ --out ingest
+#   python posecli.py --list
+#
+# `capture` builds and warms up the Pose graph on a background thread while
+# the main thread imports cv2 and opens the camera, then reports the startup
+# timeline and time-to-first-frame (measured from the start of this module,
+# interpreter startup not included).
+
+# subcommand -> (module with a main(), description)
+COMMANDS = {
+    "bench": ("posebench", "post-processing / playback benchmarks"),
+    "cache": ("landmarkcache", "cached landmark extraction and export"),
+    "checkpoint": ("checkpointrun", "resumable offline video processing"),
+    "ingest": ("batchingest", "batch ingestion of many videos"),
+    "multicam": ("multicamcapture", "synchronized multi-camera capture"),
+    "triangulate": ("triangulate", "multi-view 3D triangulation"),
+    "ring": ("sharedposering", "consume frames from a shared-memory ring"),
+    "segment": ("motionsegment", "still-pose / movement segmentation and keyframes"),
+    "tasks": ("taskspose", "offline inference on MediaPipe Tasks, several graph instances"),
+    "archive": ("archivecompact", "convert the JSON / CSV archive to verified .npz"),
+    "query": ("posequery", "time / joint / angle queries over joint CSVs"),
+    "gapfill": ("gapfill", "visibility-aware gap filling and gap report"),
+    "annotate": ("annotatedexport", "render annotated video from stored landmarks"),
+    "codec": ("posecodec", "delta-encoded compact recordings (.posez)"),
+}
+
+
+def since_start():
+    return time.perf_counter() - CLI_STARTED
+
+
+class PoseWarmup(threading.Thread):
+    # Imports mediapipe, builds the Pose graph and runs one blank frame through it
+    def __init__(self, pose_settings, frame_size=(480, 640)):
+        super().__init__(name="pose-warmup", daemon=True)
+        self.pose_settings = pose_settings
+        self.frame_size = frame_size
+        self.pose = None
+        self.error = None
+        self.timeline = {}
+
+    def run(self):
+        try:
+            import mediapipe as mp
+            import numpy as np
+
+            self.timeline["mediapipe_imported"] = since_start()
+            self.pose = mp.solutions.pose.Pose(**self.pose_settings)
+            self.timeline["pose_built"] = since_start()
+            self.pose.process(np.zeros(self.frame_size + (3,), dtype=np.uint8))
+            self.timeline["pose_warm"] = since_start()
+        except Exception as e:
+            self.error = e
+
+    def result(self):
+        self.join()
+        if self.error is not None:
+            raise self.error
+        return self.pose
+
+
+def capture(argv):
+    from posecommon import DEFAULT_POSE_SETTINGS
+
+    parser = argparse.ArgumentParser(prog="posecli.py capture",
+                                     description="Live capture with a pre-warmed Pose graph")
+    parser.add_argument("--source", default="0", help="camera index or video file")
+    parser.add_argument("--csv", default="pose_joint_data_webcam.csv")
+    parser.add_argument("--csv-layout", choices=["long", "wide"], default="long")
+    parser.add_argument("--model-complexity", type=int, default=DEFAULT_POSE_SETTINGS["model_complexity"])
+    parser.add_argument("--no-display", action="store_true")
+    parser.add_argument("--max-frames", type=int, help="stop after this many frames")
+    parser.add_argument("--stream-port", type=int, help="serve frames on ws://127.0.0.1:<port>/stream")
+    parser.add_argument("--ring", help="publish frames to this shared-memory ring")
+    parser.add_argument("--startup-report", help="write the startup timeline to this JSON file")
+    args = parser.parse_args(argv)
+
+    pose_settings = dict(DEFAULT_POSE_SETTINGS, model_complexity=args.model_complexity)
+    warmup = PoseWarmup(pose_settings)
+    warmup.start()
+
+    timeline = {}
+    import cv2
+
+    timeline["cv2_imported"] = since_start()
+    source = int(args.source) if args.source.isdigit() else args.source
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open {args.source}.")
+    timeline["capture_opened"] = since_start()
+    ret, frame = cap.read()
+    if not ret:
+        raise RuntimeError(f"No frames from {args.source}.")
+    timeline["first_frame_read"] = since_start()
+
+    from bulkcsvwriter import JointCsvWriter
+    from posecommon import joint_angles, landmarks_to_array, to_pixels
+
+    csv_writer = JointCsvWriter(args.csv, layout=args.csv_layout)
+    stream_server = None
+    if args.stream_port:
+        from posestreamserver import PoseStreamServer
+
+        stream_server = PoseStreamServer(port=args.stream_port).start()
+    ring = None
+    if args.ring:
+        from sharedposering import PoseRingProducer
+
+        ring = PoseRingProducer(args.ring)
+
+    pose = warmup.result()
+    timeline.update(warmup.timeline)
+    timeline["pose_ready"] = since_start()
+    if not args.no_display:
+        import mediapipe as mp
+
+    frame_idx = 0
+    started = time.perf_counter()
+    try:
+        while True:
+            h, w = frame.shape[:2]
+            timestamp = round(time.perf_counter() - started, 3)
+            results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            landmarks = landmarks_to_array(results.pose_landmarks)
+            angles = None
+            if landmarks is not None:
+                landmarks = to_pixels(landmarks, w, h)
+                csv_writer.add_frame(timestamp, landmarks)
+                if stream_server is not None or ring is not None:
+                    angles = joint_angles(landmarks).round(2)
+            if stream_server is not None:
+                stream_server.publish(timestamp, landmarks, angles)
+            if ring is not None:
+                ring.write(timestamp, landmarks, angles, (w, h))
+            if frame_idx == 0:
+                timeline["first_frame_processed"] = since_start()
+                print_timeline(timeline)
+
+            frame_idx += 1
+            if not args.no_display:
+                if results.pose_landmarks:
+                    mp.solutions.drawing_utils.draw_landmarks(frame, results.pose_landmarks,
+                                                              mp.solutions.pose.POSE_CONNECTIONS)
+                cv2.imshow("Live Pose Estimation", frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            if args.max_frames and frame_idx >= args.max_frames:
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        if not args.no_display:
+            cv2.destroyAllWindows()
+        pose.close()
+        csv_writer.close()
+        if stream_server is not None:
+            stream_server.stop()
+        if ring is not None:
+            ring.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Processed {frame_idx} frames in {elapsed:.1f}s "
+          f"({frame_idx / elapsed if elapsed else 0:.1f} fps); joint data saved to {args.csv}")
+    if args.startup_report:
+        import json
+
+        with open(args.startup_report, "w") as f:
+            json.dump({name: round(t, 4) for name, t in sorted(timeline.items(), key=lambda item: item[1])},
+                      f, indent=2)
+    return timeline
+
+
+def print_timeline(timeline):
+    print("Startup (s since launch):")
+    for name, t in sorted(timeline.items(), key=lambda item: item[1]):
+        print(f"  {name:<22} {t:7.3f}")
+    print(f"Time to first frame: {timeline['first_frame_processed']:.3f}s")
+
+
+def run_script(argv):
+    # Run one of the top-level scripts (e.g. everyjointangleexport) in this process
+    if not argv:
+        scripts = sorted(name[:-3] for name in os.listdir(os.path.dirname(os.path.abspath(__file__)))
+                         if name.endswith(".py") and name[:-3] not in ("posecli",))
+        print("usage: posecli.py run <script> [args...]\n\nscripts:\n  " + "\n  ".join(scripts))
+        return
+    name = argv[0][:-3] if argv[0].endswith(".py") else argv[0]
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name + ".py")
+    sys.argv = [path] + argv[1:]
+    runpy.run_path(path, run_name="__main__")
+
+
+def print_commands():
+    print("usage: posecli.py <command> [args...]\n\ncommands:")
+    print(f"  {'capture':<12} live capture with a pre-warmed Pose graph")
+    print(f"  {'run':<12} run a top-level script, e.g. run everyjointangleexport")
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<12} {description}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help", "--list"):
+        print_commands()
+        return
+    command, rest = argv[0], argv[1:]
+    if command == "capture":
+        capture(rest)
+    elif command == "run":
+        run_script(rest)
+    elif command in COMMANDS:
+        module = importlib.import_module(COMMANDS[command][0])
+        sys.argv = [f"posecli.py {command}"] + rest
+        module.main()
+    else:
+        print(f"Unknown command: {command}\n")
+        print_commands()
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from posecommon import NUM_LANDMARKS, arrays_to_pose_json
+
+# Compact recording / transport format for landmark streams (.posez).
+#
+# Landmarks are quantized to fixed steps (default 0.25 px for x / y, 1e-4
+# for z, 1e-3 for visibility, i.e. at least the precision of
+# pose_data_webcam.json) and stored as integer deltas against the previous
+# frame, so a performer holding still, or a visibility that stays at 1.0,
+# costs almost nothing. Deltas are zigzag-coded, byte-shuffled (all low
+# bytes, then all high bytes) and compressed with zlib level 1, or zstd when
+# the zstandard package is installed.
+#
+# Frames are grouped in blocks of --keyframe-interval frames. Each block
+# starts with a keyframe of absolute values and carries its own header
+# (first timestamp, quantization steps, sizes), so any block decodes on its
+# own: readers seek by reading block headers only, a truncated file loses at
+# most its last block, and a capture node can push each block over a socket
+# as soon as it is complete. Decoding a block is a handful of numpy
+# operations (unshuffle, zigzag, cumsum), with no per-frame Python loop.
+#
+# File layout: FILE_MAGIC, then blocks of
+#   BLOCK_HEADER, payload = compress(int32 ms deltas[n] + packbits(present[n, 33])
+#                                    + shuffled zigzag deltas[n, 33, 4] (uint16 or uint32))
+#
+#   python posecodec.py encode pose_data_webcam.json --out pose_data_webcam.posez
+#   python posecodec.py decode pose_data_webcam.posez --json pose_data_decoded.json --from 10 --to 20
+#   python posecodec.py info pose_data_webcam.posez
+#
+# Live capture writes it directly with delta_recording_path in
+# veryimportantarcanglepose.py; motionsegment / gapfill / annotatedexport
+# read .posez files like any other recording.
+
+FILE_MAGIC = b"POSEZ\x00\x01\n"
+BLOCK_MAGIC = 0x4B4C4250  # "PBLK"
+VERSION = 1
+# magic, version, compression, value width (bytes), n_frames, t0, xy / z / visibility steps,
+# raw payload size, compressed payload size
+BLOCK_HEADER = struct.Struct("<IBBBxHdfffII")
+
+COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_ZSTD = 0, 1, 2
+COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+DEFAULT_STEPS = (0.25, 1e-4, 1e-3)  # x / y px, z, visibility
+
+
+def _compressor(compression, level):
+    if compression == COMPRESSION_ZLIB:
+        return lambda data: zlib.compress(data, level)
+    if compression == COMPRESSION_ZSTD:
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=level).compress
+    return bytes
+
+
+def _decompress(compression, payload):
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(payload)
+    if compression == COMPRESSION_ZSTD:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+
+def default_compression():
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return "zlib"
+    return "zstd"
+
+
+def quantize(landmarks, steps=DEFAULT_STEPS):
+    # (n, 33, 4) float -> int32 grid indices and (n, 33) present mask; NaN landmarks -> 0
+    present = ~np.isnan(landmarks[..., 0])
+    scale = np.array([1 / steps[0], 1 / steps[0], 1 / steps[1], 1 / steps[2]], dtype=np.float64)
+    q = np.rint(np.nan_to_num(landmarks.astype(np.float64)) * scale).astype(np.int32)
+    q[~present] = 0
+    return q, present
+
+
+def encode_block(timestamps, landmarks, steps=DEFAULT_STEPS, compression=COMPRESSION_ZLIB, level=1):
+    # timestamps (n,), landmarks (n, 33, 4) with NaN for missing -> block bytes
+    n = len(timestamps)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    steps = tuple(float(step) for step in np.float32(steps))  # as stored in the header
+    q, present = quantize(np.asarray(landmarks), steps)
+
+    # Missing landmarks repeat the last value seen in the block, so they cost a zero delta
+    idx = np.arange(n)[:, None]
+    last_seen = np.maximum.accumulate(np.where(present, idx, 0), axis=0)
+    q = q[last_seen, np.arange(NUM_LANDMARKS)[None, :]]
+    deltas = q.copy()
+    deltas[1:] -= q[:-1]
+    zigzag = ((deltas << 1) ^ (deltas >> 31)).view(np.uint32)
+    width = 2 if n == 0 or zigzag.max() < 1 << 16 else 4
+    shuffled = zigzag.astype(f"<u{width}").reshape(-1).view(np.uint8).reshape(-1, width).T
+
+    t0 = float(timestamps[0]) if n else 0.0
+    ms = np.rint((timestamps - t0) * 1000).astype(np.int64)
+    ms_deltas = np.diff(ms, prepend=0).astype("<i4")
+    raw = ms_deltas.tobytes() + np.packbits(present.reshape(-1)).tobytes() + shuffled.tobytes()
+    payload = _compressor(compression, level)(raw)
+    header = BLOCK_HEADER.pack(BLOCK_MAGIC, VERSION, compression, width, n, t0,
+                               *steps, len(raw), len(payload))
+    return header + payload
+
+
+def parse_block_header(data):
+    (magic, version, compression, width, n, t0, xy_step, z_step, vis_step,
+     raw_size, payload_size) = BLOCK_HEADER.unpack(data)
+    if magic != BLOCK_MAGIC or version != VERSION:
+        raise ValueError("Not a pose delta block.")
+    return {"compression": compression, "width": width, "frames": n, "t0": t0,
+            "steps": (xy_step, z_step, vis_step), "raw_size": raw_size, "payload_size": payload_size}
+
+
+def decode_block(header, payload):
+    # -> timestamps (n,) float64, landmarks (n, 33, 4) float32 with NaN where missing
+    n = header["frames"]
+    width = header["width"]
+    raw = _decompress(header["compression"], payload)
+    if len(raw) != header["raw_size"]:
+        raise ValueError("Corrupt pose delta block.")
+
+    ms = np.cumsum(np.frombuffer(raw, dtype="<i4", count=n), dtype=np.int64)
+    offset = 4 * n
+    mask_size = (n * NUM_LANDMARKS + 7) // 8
+    present = np.unpackbits(np.frombuffer(raw, dtype=np.uint8, count=mask_size, offset=offset),
+                            count=n * NUM_LANDMARKS).astype(bool).reshape(n, NUM_LANDMARKS)
+    offset += mask_size
+    count = n * NUM_LANDMARKS * 4
+    shuffled = np.frombuffer(raw, dtype=np.uint8, count=count * width, offset=offset).reshape(width, count)
+    zigzag = np.ascontiguousarray(shuffled.T).view(f"<u{width}").reshape(n, NUM_LANDMARKS, 4)
+    zigzag = zigzag.astype(np.int64)
+    deltas = (zigzag >> 1) ^ -(zigzag & 1)
+    q = np.cumsum(deltas, axis=0)
+
+    xy_step, z_step, vis_step = header["steps"]
+    scale = np.array([xy_step, xy_step, z_step, vis_step], dtype=np.float64)
+    landmarks = (q * scale).astype(np.float32)
+    landmarks[~present] = np.nan
+    timestamps = np.round(header["t0"] + ms / 1000.0, 3)
+    return timestamps, landmarks
+
+
+class PoseDeltaEncoder:
+    # push() frames as they come; returns a finished block (bytes) every keyframe_interval frames
+    def __init__(self, keyframe_interval=30, steps=DEFAULT_STEPS, compression=None, level=None):
+        compression = COMPRESSION_NAMES[compression or default_compression()]
+        self.keyframe_interval = keyframe_interval
+        self.steps = tuple(steps)
+        self.compression = compression
+        self.level = level if level is not None else (1 if compression == COMPRESSION_ZLIB else 3)
+        self.timestamps = np.empty(keyframe_interval, dtype=np.float64)
+        self.landmarks = np.empty((keyframe_interval, NUM_LANDMARKS, 4), dtype=np.float32)
+        self.count = 0
+
+    def push(self, timestamp, landmarks=None):
+        self.timestamps[self.count] = timestamp
+        if landmarks is None:
+            self.landmarks[self.count] = np.nan
+        else:
+            self.landmarks[self.count] = landmarks
+        self.count += 1
+        if self.count == self.keyframe_interval:
+            return self.flush()
+        return None
+
+    def flush(self):
+        if not self.count:
+            return None
+        block = encode_block(self.timestamps[:self.count], self.landmarks[:self.count],
+                             self.steps, self.compression, self.level)
+        self.count = 0
+        return block
+
+
+class PoseDeltaWriter:
+    def __init__(self, path, **encoder_args):
+        self.path = path
+        self.encoder = PoseDeltaEncoder(**encoder_args)
+        self.file = open(path, "wb")
+        self.file.write(FILE_MAGIC)
+        self.frames = 0
+        self.blocks = 0
+
+    def write(self, timestamp, landmarks=None):
+        self.frames += 1
+        self._write_block(self.encoder.push(timestamp, landmarks))
+
+    def write_frames(self, timestamps, landmarks):
+        for timestamp, frame in zip(timestamps.tolist(), landmarks):
+            self.write(timestamp, frame)
+
+    def _write_block(self, block):
+        if block is not None:
+            self.file.write(block)
+            self.blocks += 1
+
+    def close(self):
+        self._write_block(self.encoder.flush())
+        self.file.close()
+        return {"path": self.path, "frames": self.frames, "blocks": self.blocks,
+                "bytes": os.path.getsize(self.path)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_blocks(f, with_payload=True):
+    # Yields (offset, header, payload or None) from a .posez file or a block stream (e.g. a socket file);
+    # stops quietly at a truncated trailing block
+    offset = f.tell() if f.seekable() else 0
+    while True:
+        data = f.read(BLOCK_HEADER.size)
+        if len(data) < BLOCK_HEADER.size:
+            return
+        header = parse_block_header(data)
+        if with_payload:
+            payload = f.read(header["payload_size"])
+            if len(payload) < header["payload_size"]:
+                return
+        else:
+            payload = None
+            end = f.seek(header["payload_size"], os.SEEK_CUR)
+            if end > os.fstat(f.fileno()).st_size:
+                return
+        yield offset, header, payload
+        offset += BLOCK_HEADER.size + header["payload_size"]
+
+
+def _open(path):
+    f = open(path, "rb")
+    if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+        f.close()
+        raise ValueError(f"{path} is not a .posez recording.")
+    return f
+
+
+def block_index(path):
+    # -> list of (offset, header) without decompressing anything
+    with _open(path) as f:
+        return [(offset, header) for offset, header, _ in read_blocks(f, with_payload=False)]
+
+
+def read_recording(path, start=None, end=None):
+    # -> timestamps, landmarks for the whole file or [start, end] seconds; only overlapping blocks are decoded
+    index = block_index(path)
+    starts = [header["t0"] for _, header in index]
+    first = 0
+    if start is not None:
+        # Last block starting at or before `start`
+        first = max(int(np.searchsorted(starts, start, side="right")) - 1, 0)
+    timestamps = []
+    landmarks = []
+    with open(path, "rb") as f:
+        for offset, header in index[first:]:
+            if end is not None and header["t0"] > end:
+                break
+            f.seek(offset + BLOCK_HEADER.size)
+            ts, lm = decode_block(header, f.read(header["payload_size"]))
+            timestamps.append(ts)
+            landmarks.append(lm)
+    if not timestamps:
+        return np.empty(0), np.empty((0, NUM_LANDMARKS, 4), dtype=np.float32)
+    timestamps = np.concatenate(timestamps)
+    landmarks = np.concatenate(landmarks)
+    keep = np.ones(len(timestamps), dtype=bool)
+    if start is not None:
+        keep &= timestamps >= start
+    if end is not None:
+        keep &= timestamps <= end
+    return timestamps[keep], landmarks[keep]
+
+
+def max_error(original, decoded):
+    # Largest absolute difference per channel (x, y, z, visibility) over landmarks present in both
+    both = ~np.isnan(original[..., 0]) & ~np.isnan(decoded[..., 0])
+    if not both.any():
+        return [0.0] * 4
+    return np.abs(original[both].astype(np.float64) - decoded[both]).max(axis=0).round(6).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta-encoded, compressed landmark recordings (.posez)")
+    parser.add_argument("action", choices=["encode", "decode", "info"])
+    parser.add_argument("input", help="encode: pose_data.json / .npz / wide joint CSV; else a .posez file")
+    parser.add_argument("--out", help="encode: output .posez (default <input>.posez)")
+    parser.add_argument("--time-key", default="timestamp_sec")
+    parser.add_argument("--keyframe-interval", type=int, default=30, help="frames per block")
+    parser.add_argument("--xy-step", type=float, default=DEFAULT_STEPS[0], help="x / y quantization (px)")
+    parser.add_argument("--z-step", type=float, default=DEFAULT_STEPS[1])
+    parser.add_argument("--visibility-step", type=float, default=DEFAULT_STEPS[2])
+    parser.add_argument("--compression", choices=sorted(COMPRESSION_NAMES), help="default zstd if installed, else zlib")
+    parser.add_argument("--level", type=int)
+    parser.add_argument("--from", dest="start", type=float, help="decode: start time (s)")
+    parser.add_argument("--to", dest="end", type=float, help="decode: end time (s)")
+    parser.add_argument("--json", help="decode: write pose_data.json-style keypoints + edges")
+    parser.add_argument("--npz", help="decode: write timestamps and landmarks arrays")
+    args = parser.parse_args()
+
+    if args.action == "encode":
+        from motionsegment import load_recording
+
+        timestamps, landmarks = load_recording(args.input, args.time_key)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if args.time_key == "timestamp_ms":
+            timestamps = timestamps / 1000.0
+        out_path = args.out or os.path.splitext(args.input)[0] + ".posez"
+        started = time.perf_counter()
+        with PoseDeltaWriter(out_path, keyframe_interval=args.keyframe_interval,
+                             steps=(args.xy_step, args.z_step, args.visibility_step),
+                             compression=args.compression, level=args.level) as writer:
+            writer.write_frames(timestamps, landmarks)
+        encode_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        _, decoded = read_recording(out_path)
+        decode_seconds = time.perf_counter() - started
+        size = os.path.getsize(out_path)
+        source_size = os.path.getsize(args.input)
+        print(f"{len(timestamps)} frames, {writer.blocks} blocks: {source_size} -> {size} bytes "
+              f"({source_size / max(size, 1):.1f}x smaller, {size / max(len(timestamps), 1):.1f} bytes/frame)")
+        print(f"Encode {encode_seconds:.3f}s, decode {decode_seconds:.3f}s, "
+              f"max error x/y/z/visibility {max_error(landmarks, decoded)}")
+        print(f"Saved to {out_path}")
+        return
+
+    if args.action == "info":
+        index = block_index(args.input)
+        frames = sum(header["frames"] for _, header in index)
+        size = os.path.getsize(args.input)
+        print(f"{args.input}: {frames} frames in {len(index)} blocks, {size} bytes "
+              f"({size / max(frames, 1):.1f} bytes/frame)")
+        if index:
+            header = index[0][1]
+            compression = {v: k for k, v in COMPRESSION_NAMES.items()}[header["compression"]]
+            print(f"Starts at {header['t0']}s, last block at {index[-1][1]['t0']}s, steps {[float(f'{step:.6g}') for step in header['steps']]}, "
+                  f"{compression}")
+        return
+
+    timestamps, landmarks = read_recording(args.input, args.start, args.end)
+    print(f"Decoded {len(timestamps)} frames")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(arrays_to_pose_json(timestamps, landmarks, args.time_key, with_edges=True), f, indent=2)
+        print(f"Pose data saved to {args.json}")
+    if args.npz:
+        np.savez_compressed(args.npz, timestamps=timestamps, landmarks=landmarks)
+        print(f"Arrays saved to {args.npz}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+import csv
+import hashlib
+import json
+import math
+import os
+from collections import defaultdict
+
+import numpy as np
+
+# Shared pose definitions and post-processing helpers.
+#
+# Mirrors what the capture / export scripts do inline, but keyed by plain
+# landmark indices so it can be used without importing mediapipe. A frame of
+# landmarks is a float32 array of shape (33, 4): x_px, y_px, z, visibility.
+# A recording is (frames, 33, 4) plus a float64 array of timestamps; frames
+# where nobody was detected are all-NaN.
+
+NUM_LANDMARKS = 33
+LANDMARK_FIELDS = ["x", "y", "z", "visibility"]
+
+# Same order as mp.solutions.pose.PoseLandmark
+LANDMARK_NAMES = [
+    "NOSE", "LEFT_EYE_INNER", "LEFT_EYE", "LEFT_EYE_OUTER",
+    "RIGHT_EYE_INNER", "RIGHT_EYE", "RIGHT_EYE_OUTER",
+    "LEFT_EAR", "RIGHT_EAR", "MOUTH_LEFT", "MOUTH_RIGHT",
+    "LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_ELBOW", "RIGHT_ELBOW",
+    "LEFT_WRIST", "RIGHT_WRIST", "LEFT_PINKY", "RIGHT_PINKY",
+    "LEFT_INDEX", "RIGHT_INDEX", "LEFT_THUMB", "RIGHT_THUMB",
+    "LEFT_HIP", "RIGHT_HIP", "LEFT_KNEE", "RIGHT_KNEE",
+    "LEFT_ANKLE", "RIGHT_ANKLE", "LEFT_HEEL", "RIGHT_HEEL",
+    "LEFT_FOOT_INDEX", "RIGHT_FOOT_INDEX",
+]
+
+# Same pairs as mp.solutions.pose.POSE_CONNECTIONS
+POSE_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8),
+    (9, 10), (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21),
+    (17, 19), (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+]
+
+# Joint sets (a, b, c) -> angle at b, same as the capture scripts
+JOINT_SETS = {
+    "left_elbow": (11, 13, 15),
+    "right_elbow": (12, 14, 16),
+    "left_shoulder": (23, 11, 13),
+    "right_shoulder": (24, 12, 14),
+    "left_knee": (23, 25, 27),
+    "right_knee": (24, 26, 28),
+}
+
+JOINT_CSV_FIELDS = ["timestamp_sec", "joint", "x", "y", "angle_deg"]
+DIFF_CSV_FIELDS = ["timestamp_start", "timestamp_end", "keypoint_id",
+                   "x_start", "y_start", "z_start",
+                   "x_end", "y_end", "z_end",
+                   "dx", "dy", "dz"]
+ANGLE_DIFF_CSV_FIELDS = ["timestamp_sec", "joint", "angle_diff_deg"]
+
+# mp.solutions.pose.Pose arguments the capture scripts use; landmark caches are keyed by them
+DEFAULT_POSE_SETTINGS = {
+    "static_image_mode": False,
+    "model_complexity": 1,
+    "enable_segmentation": False,
+    "min_detection_confidence": 0.7,
+    "min_tracking_confidence": 0.7,
+}
+
+
+# Angle calculation (safe acos with clamping)
+def calculate_angle(a, b, c):
+    ba = [a[0] - b[0], a[1] - b[1]]
+    bc = [c[0] - b[0], c[1] - b[1]]
+    dot = ba[0]*bc[0] + ba[1]*bc[1]
+    mag_ba = math.hypot(*ba)
+    mag_bc = math.hypot(*bc)
+    if mag_ba == 0 or mag_bc == 0:
+        return 0
+    cos_angle = max(-1.0, min(1.0, dot / (mag_ba * mag_bc)))
+    angle = math.acos(cos_angle)
+    return round(math.degrees(angle), 2)
+
+
+def joint_angles(landmarks, joint_sets=JOINT_SETS, dims=2):
+    # Vectorized calculate_angle over (..., 33, >=dims) -> (..., len(joint_sets));
+    # dims=3 gives true 3D angles for triangulated points
+    idx = np.array(list(joint_sets.values()))
+    pts = np.asarray(landmarks, dtype=np.float64)[..., :dims]
+    a, b, c = pts[..., idx[:, 0], :], pts[..., idx[:, 1], :], pts[..., idx[:, 2], :]
+    ba = a - b
+    bc = c - b
+    if dims == 2:
+        mag = np.hypot(ba[..., 0], ba[..., 1]) * np.hypot(bc[..., 0], bc[..., 1])
+    else:
+        mag = np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1)
+    dot = (ba * bc).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos_angle = np.clip(dot / mag, -1.0, 1.0)
+    angles = np.round(np.degrees(np.arccos(cos_angle)), 2)
+    return np.where(mag == 0, 0.0, angles)
+
+
+def load_pose_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def pose_json_to_arrays(pose_data, time_key="timestamp_sec"):
+    # List of {"timestamp_sec", "keypoints": [...]} -> (timestamps, landmarks)
+    timestamps = np.empty(len(pose_data), dtype=np.float64)
+    landmarks = np.full((len(pose_data), NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    for i, frame in enumerate(pose_data):
+        timestamps[i] = frame.get(time_key, 0.0)
+        for kp in frame.get("keypoints", []):
+            landmarks[i, kp["id"]] = (kp["x"], kp["y"], kp["z"], kp.get("visibility", 1.0))
+    return timestamps, landmarks
+
+
+def arrays_to_pose_json(timestamps, landmarks, time_key="timestamp_sec", with_edges=False):
+    # Inverse of pose_json_to_arrays; NaN landmarks (and edges touching them) are left out,
+    # so all-NaN frames get empty keypoints/edges
+    frames = []
+    for ts, frame in zip(timestamps.tolist(), landmarks):
+        keypoints = []
+        edges = []
+        if not np.isnan(frame[:, 0]).all():
+            by_id = {}
+            for idx, (x, y, z, vis) in enumerate(frame.tolist()):
+                if x != x:
+                    continue
+                by_id[idx] = {
+                    "id": idx,
+                    "x": round(x, 2),
+                    "y": round(y, 2),
+                    "z": round(z, 4),
+                    "visibility": round(vis, 3)
+                }
+                keypoints.append(by_id[idx])
+            if with_edges:
+                for a, b in POSE_CONNECTIONS:
+                    if a not in by_id or b not in by_id:
+                        continue
+                    kp_a = by_id[a]
+                    kp_b = by_id[b]
+                    edges.append({
+                        "start_id": a,
+                        "end_id": b,
+                        "start_xy": [kp_a["x"], kp_a["y"]],
+                        "end_xy": [kp_b["x"], kp_b["y"]]
+                    })
+        record = {time_key: ts, "keypoints": keypoints}
+        if with_edges:
+            record["edges"] = edges
+        frames.append(record)
+    return frames
+
+
+def landmarks_to_array(pose_landmarks):
+    # results.pose_landmarks -> (33, 4) normalized float32, or None if nobody found
+    if not pose_landmarks:
+        return None
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark],
+                    dtype=np.float32)
+
+
+def to_pixels(landmarks, width, height):
+    # Normalized (..., 33, 4) -> pixel x/y, z and visibility untouched
+    out = np.array(landmarks, dtype=np.float32, copy=True)
+    out[..., 0] *= width
+    out[..., 1] *= height
+    return out
+
+
+def keypoint_diff_rows(t_start, t_end, kp_start, kp_end):
+    # {id: keypoint} at both ends -> (csv_rows, json_rows) for ids present in both
+    csv_rows = []
+    json_rows = []
+    for kp_id in kp_start:
+        if kp_id in kp_end:
+            start = kp_start[kp_id]
+            end = kp_end[kp_id]
+            dx = round(end["x"] - start["x"], 2)
+            dy = round(end["y"] - start["y"], 2)
+            dz = round(end["z"] - start["z"], 4)
+            csv_rows.append({
+                "timestamp_start": t_start,
+                "timestamp_end": t_end,
+                "keypoint_id": kp_id,
+                "x_start": start["x"],
+                "y_start": start["y"],
+                "z_start": start["z"],
+                "x_end": end["x"],
+                "y_end": end["y"],
+                "z_end": end["z"],
+                "dx": dx,
+                "dy": dy,
+                "dz": dz
+            })
+            json_rows.append({
+                "keypoint_id": kp_id,
+                "from_timestamp": t_start,
+                "to_timestamp": t_end,
+                "start_pos": [start["x"], start["y"], start["z"]],
+                "end_pos": [end["x"], end["y"], end["z"]],
+                "diff": [dx, dy, dz]
+            })
+    return csv_rows, json_rows
+
+
+def pose_diff_rows(pose_data, window=5.0):
+    # Displacement between frames `window` seconds apart (rwjasonvarmaposetwoesti.py)
+    pose_by_time = {frame["timestamp_sec"]: frame for frame in pose_data}
+    timestamps = sorted(pose_by_time.keys())
+
+    csv_rows = []
+    json_output = []
+    for t_start in timestamps:
+        t_end = round(t_start + window, 3)
+        if t_end not in pose_by_time:
+            continue
+        kp_start = {kp["id"]: kp for kp in pose_by_time[t_start]["keypoints"]}
+        kp_end = {kp["id"]: kp for kp in pose_by_time[t_end]["keypoints"]}
+        rows, json_rows = keypoint_diff_rows(t_start, t_end, kp_start, kp_end)
+        csv_rows.extend(rows)
+        json_output.extend(json_rows)
+    return csv_rows, json_output
+
+
+class StreamingPoseDiff:
+    # Live version of the per-second displacement in veryimportantarcanglepose.py:
+    # frames are bucketed by round(timestamp), each bucket is represented by its
+    # first frame, and bucket k is compared with bucket k - window as soon as k
+    # starts. Only the last window + 1 buckets are kept, so memory is constant.
+    def __init__(self, window=5):
+        self.window = window
+        self.buckets = {}
+        self.current = None
+
+    def add(self, timestamp, keypoints):
+        # -> (csv_rows, json_rows) completed by this frame, usually empty
+        bucket = round(timestamp)
+        if bucket == self.current:
+            return [], []
+        self.current = bucket
+        self.buckets[bucket] = {kp["id"]: kp for kp in keypoints}
+        for old in [b for b in self.buckets if b < bucket - self.window]:
+            del self.buckets[old]
+        t_start = bucket - self.window
+        if t_start not in self.buckets:
+            return [], []
+        t_end = round(t_start + float(self.window), 3)
+        return keypoint_diff_rows(t_start, t_end, self.buckets[t_start], self.buckets[bucket])
+
+
+def read_joint_angles(rows):
+    # Rows of the long joint CSV -> {timestamp: {joint: angle}}
+    csv_data = defaultdict(dict)
+    for row in rows:
+        angle_str = row['angle_deg'].strip()
+        if angle_str:  # only store if angle is valid
+            csv_data[float(row['timestamp_sec'])][row['joint']] = float(angle_str)
+    return csv_data
+
+
+def joint_angle_diff_rows(csv_data, window=5.0):
+    # Angle change against `window` seconds earlier (everyjointangleexport.py)
+    output_rows = []
+    for t_current in sorted(csv_data):
+        t_prev = t_current - window
+        if t_prev in csv_data:
+            for joint, angle_now in csv_data[t_current].items():
+                angle_prev = csv_data[t_prev].get(joint)
+                if angle_prev is not None:
+                    output_rows.append({
+                        "timestamp_sec": t_current,
+                        "joint": joint,
+                        "angle_diff_deg": round(angle_now - angle_prev, 2)
+                    })
+    return output_rows
+
+
+_digest_memo = {}
+
+
+def file_digest(path, chunk_size=1 << 20):
+    # Content hash of a video / data file, memoized on (path, size, mtime)
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _digest_memo:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        _digest_memo[memo_key] = h.hexdigest()
+    return _digest_memo[memo_key]
+
+
+def write_csv_rows(path, fieldnames, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class JsonListWriter:
+    # Writes a JSON list one item at a time; same text as json.dump(items, f, indent=2)
+    def __init__(self, path):
+        self.file = open(path, "w")
+        self.count = 0
+
+    def write(self, item):
+        chunk = json.dumps(item, indent=2).replace("\n", "\n  ")
+        self.file.write(("[\n  " if self.count == 0 else ",\n  ") + chunk)
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]" if self.count else "[]")
+        self.file.close()
@@ -0,0 +1,169 @@
+import json
+import time
+
+# Per-stage frame profiler for the capture loops.
+#
+# Usage inside a loop:
+#     profiler.start_frame()
+#     ret, frame = cap.read();              profiler.lap("decode")
+#     rgb = cv2.cvtColor(...);              profiler.lap("color")
+#     results = pose.process(rgb);          profiler.lap("inference")
+#     ...
+#     profiler.end_frame()
+#
+# lap() charges the time since the previous lap to the named stage, so stages
+# that are interleaved inside one frame (angle math / csv / drawing per joint)
+# simply accumulate. At end_frame() every stage total goes into its histogram.
+
+STAGES = ["decode", "detection", "color", "inference", "angles", "draw", "serialize", "display"]
+
+
+class LatencyHistogram:
+    # HDR-style log-linear histogram over integer nanoseconds. Values below
+    # 2**sub_bucket_bits are exact, above that every power of two is split
+    # into 2**(sub_bucket_bits - 1) buckets, i.e. ~1.5% relative error at 7 bits.
+
+    def __init__(self, sub_bucket_bits=7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.half = 1 << (sub_bucket_bits - 1)
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        shift = value.bit_length() - self.sub_bucket_bits
+        if shift <= 0:
+            return value
+        return shift * self.half + (value >> shift)
+
+    def _lowest(self, index):
+        if index < 2 * self.half:
+            return index
+        shift = index // self.half - 1
+        return (index - shift * self.half) << shift
+
+    def record(self, value):
+        value = max(int(value), 0)
+        idx = self._index(value)
+        self.counts[idx] = self.counts.get(idx, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        target = max(1, int(round(p / 100.0 * self.count)))
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen >= target:
+                low = self._lowest(idx)
+                high = self._lowest(idx + 1)
+                return min((low + high - 1) // 2, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other):
+        for idx, n in other.counts.items():
+            self.counts[idx] = self.counts.get(idx, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+
+class FrameProfiler:
+    def __init__(self, trace_path=None, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.histograms = {}
+        self.frame_histogram = LatencyHistogram()
+        self.frames = 0
+        self.first_start = None
+        self.last_end = None
+        self._frame_start = 0
+        self._last = 0
+        self._current = {}
+        self.trace_file = open(trace_path, "w") if trace_path else None
+
+    def start_frame(self):
+        now = self.clock()
+        if self.first_start is None:
+            self.first_start = now
+        self._frame_start = now
+        self._last = now
+        self._current = {}
+
+    def lap(self, stage):
+        now = self.clock()
+        self._current[stage] = self._current.get(stage, 0) + now - self._last
+        self._last = now
+
+    def skip(self):
+        # Drop the time since the last lap (e.g. a waitKey we don't care about)
+        self._last = self.clock()
+
+    def end_frame(self):
+        now = self.clock()
+        self.last_end = now
+        for stage, ns in self._current.items():
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = LatencyHistogram()
+            hist.record(ns)
+        frame_ns = now - self._frame_start
+        self.frame_histogram.record(frame_ns)
+        if self.trace_file is not None:
+            row = {"frame": self.frames, "frame_ns": frame_ns}
+            row.update(self._current)
+            self.trace_file.write(json.dumps(row) + "\n")
+        self.frames += 1
+
+    def summary(self):
+        def describe(hist):
+            return {
+                "count": hist.count,
+                "mean_ms": round(hist.mean() / 1e6, 3),
+                "p50_ms": round(hist.percentile(50) / 1e6, 3),
+                "p95_ms": round(hist.percentile(95) / 1e6, 3),
+                "p99_ms": round(hist.percentile(99) / 1e6, 3),
+                "max_ms": round((hist.max or 0) / 1e6, 3),
+            }
+
+        wall_ns = (self.last_end - self.first_start) if self.frames else 0
+        ordered = [s for s in STAGES if s in self.histograms]
+        ordered += sorted(s for s in self.histograms if s not in STAGES)
+        return {
+            "frames": self.frames,
+            "wall_sec": round(wall_ns / 1e9, 3),
+            "fps": round(self.frames / (wall_ns / 1e9), 2) if wall_ns else 0.0,
+            "frame": describe(self.frame_histogram),
+            "stages": {s: describe(self.histograms[s]) for s in ordered},
+        }
+
+    def write_summary(self, path):
+        summary = self.summary()
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"{summary['frames']} frames in {summary['wall_sec']}s ({summary['fps']} fps)")
+        print(f"{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+        rows = list(summary["stages"].items()) + [("frame", summary["frame"])]
+        for name, s in rows:
+            print(f"{name:<12}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['mean_ms']:>10}")
+
+    def close(self):
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
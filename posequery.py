@@ -0,0 +1,319 @@
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+from posecommon import JOINT_CSV_FIELDS, write_csv_rows
+
+# Queries over joint CSVs without re-parsing them.
+#
+# The first query against pose_joint_data.csv pivots it once into a columnar
+# store next to it (<csv>.cols/): sorted frame timestamps, an angle matrix
+# (frames x joints) and an x/y matrix (frames x names), saved as .npy and
+# memory-mapped on every later query. The store is rebuilt when the CSV's
+# size or mtime changes. Time ranges are resolved with a binary search on the
+# timestamps and joints by column lookup, so a query only touches the rows and
+# columns it needs, and the filters are vectorized.
+#
+#   python posequery.py pose_joint_data.csv below right_knee 90 --from 60 --to 120
+#   python posequery.py pose_joint_data.csv crossings left_elbow 45 --direction up
+#   python posequery.py pose_joint_data.csv stats --joints left_knee right_knee
+#   python posequery.py pose_joint_data.csv range --joints right_knee --above 150 --csv out.csv
+#
+# Long and wide joint CSVs are both accepted, as are joint_csv archives from
+# archivecompact.py (.csv.npz).
+
+STORE_VERSION = 1
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "version": STORE_VERSION}
+
+
+def _read_long_rows(path):
+    # -> timestamps, names, x, y, angle as flat row arrays
+    if path.endswith(".npz"):
+        from archivecompact import load_archive
+
+        kind, arrays = load_archive(path)
+        if kind != "joint_csv":
+            raise ValueError(f"{path} is a {kind} archive, not a joint CSV")
+        timestamps = np.repeat(arrays["timestamps"].astype(np.float64), arrays["timestamp_runs"])
+        names = arrays["joint_names"][arrays["joint"]]
+        return (timestamps, names, arrays["x"].astype(np.float64), arrays["y"].astype(np.float64),
+                arrays["angle_deg"].astype(np.float64))
+
+    with open(path, newline="") as f:
+        text = f.read()
+    header, _, body = text.partition("\n")
+    if header.strip().split(",") != JOINT_CSV_FIELDS:
+        return None
+    body = body.replace("\r\n", "\n").rstrip("\n")
+    fields = body.replace("\n", ",").split(",") if body else []
+    if '"' not in body and len(fields) == 5 * (body.count("\n") + 1 if body else 0):
+        # Our writers never quote, so one flat split is enough
+        columns = np.array(fields, dtype=str).reshape(-1, 5).T
+    else:
+        columns = list(zip(*csv.reader(body.splitlines()))) or [(), (), (), (), ()]
+    ts, names, x, y, angle = columns
+
+    def numbers(values):
+        values = np.array(values, dtype=str)
+        values[values == ""] = "nan"
+        return values.astype(np.float64)
+
+    return numbers(ts), np.array(names), numbers(x), numbers(y), numbers(angle)
+
+
+def build_store(source, store_dir):
+    rows = _read_long_rows(source)
+    if rows is not None:
+        ts, names, x, y, angle = rows
+        timestamps, frame = np.unique(ts, return_inverse=True)
+        all_names, code = np.unique(names, return_inverse=True)
+        # Keep the CSV's own name order (landmarks first, then joints)
+        first_seen = np.full(len(all_names), len(names))
+        np.minimum.at(first_seen, code, np.arange(len(names)))
+        order = np.argsort(first_seen)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        code = rank[code]
+        all_names = all_names[order]
+
+        xy = np.full((len(timestamps), len(all_names), 2), np.nan, dtype=np.float32)
+        xy[frame, code, 0] = x
+        xy[frame, code, 1] = y
+        has_angle = ~np.isnan(angle)
+        joint_codes = np.unique(code[has_angle])
+        joint_col = np.full(len(all_names), -1)
+        joint_col[joint_codes] = np.arange(len(joint_codes))
+        angles = np.full((len(timestamps), len(joint_codes)), np.nan, dtype=np.float32)
+        angles[frame[has_angle], joint_col[code[has_angle]]] = angle[has_angle]
+        joints = all_names[joint_codes].tolist()
+        names = all_names.tolist()
+    else:
+        from bulkcsvwriter import read_wide_csv
+        from posecommon import JOINT_SETS, LANDMARK_NAMES
+
+        timestamps, landmark_xy, angles = read_wide_csv(source)
+        joints = list(JOINT_SETS)
+        # Joint rows carry the x/y of their center landmark, as in the long layout
+        centers = [b for _, b, _ in JOINT_SETS.values()]
+        names = list(LANDMARK_NAMES) + joints
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        xy = np.concatenate([landmark_xy, landmark_xy[:, centers]], axis=1)[order].astype(np.float32)
+        angles = angles[order].astype(np.float32)
+
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, "timestamps.npy"), timestamps.astype(np.float64))
+    np.save(os.path.join(store_dir, "angles.npy"), angles)
+    np.save(os.path.join(store_dir, "xy.npy"), xy)
+    meta = dict(_source_stamp(source), names=names, joints=joints)
+    with open(os.path.join(store_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+class PoseStore:
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        self.names = self.meta["names"]
+        self.joints = self.meta["joints"]
+        self.name_index = {name: i for i, name in enumerate(self.names)}
+        self.joint_index = {name: i for i, name in enumerate(self.joints)}
+        self.timestamps = np.load(os.path.join(store_dir, "timestamps.npy"), mmap_mode="r")
+        self.angles = np.load(os.path.join(store_dir, "angles.npy"), mmap_mode="r")
+        self.xy = np.load(os.path.join(store_dir, "xy.npy"), mmap_mode="r")
+
+    @classmethod
+    def open(cls, source, store_dir=None, rebuild=False):
+        store_dir = store_dir or source + ".cols"
+        meta_path = os.path.join(store_dir, "meta.json")
+        stale = rebuild or not os.path.exists(meta_path)
+        if not stale:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            stale = {k: meta.get(k) for k in ("size", "mtime_ns", "version")} != _source_stamp(source)
+        if stale:
+            build_store(source, store_dir)
+        return cls(store_dir)
+
+    def time_slice(self, start=None, end=None):
+        # Inclusive [start, end] as a row slice, by binary search on the sorted timestamps
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, start, side="left"))
+        hi = len(self.timestamps) if end is None else int(np.searchsorted(self.timestamps, end, side="right"))
+        return slice(lo, hi)
+
+    def _joint(self, joint):
+        if joint not in self.joint_index:
+            raise KeyError(f"No angles for {joint!r}; joints: {', '.join(self.joints)}")
+        return self.joint_index[joint]
+
+    def rows(self, joints=None, start=None, end=None, below=None, above=None):
+        # Long-format rows for the given joints, optionally filtered on the angle
+        rows_slice = self.time_slice(start, end)
+        timestamps = np.asarray(self.timestamps[rows_slice])
+        out = []
+        for joint in joints or self.joints:
+            j = self._joint(joint)
+            n = self.name_index[joint]
+            angle = np.asarray(self.angles[rows_slice, j])
+            mask = ~np.isnan(angle)
+            if below is not None:
+                mask &= angle < below
+            if above is not None:
+                mask &= angle > above
+            idx = np.flatnonzero(mask)
+            xy = np.asarray(self.xy[rows_slice, n])[idx]
+            for ts, (x, y), a in zip(timestamps[idx].tolist(), xy.tolist(), angle[idx].tolist()):
+                out.append({"timestamp_sec": ts, "joint": joint, "x": x, "y": y, "angle_deg": round(a, 2)})
+        out.sort(key=lambda row: row["timestamp_sec"])
+        return out
+
+    def intervals(self, joint, start=None, end=None, below=None, above=None, min_duration=0.0):
+        # Spans of consecutive frames where the predicate holds
+        rows_slice = self.time_slice(start, end)
+        timestamps = np.asarray(self.timestamps[rows_slice])
+        angle = np.asarray(self.angles[rows_slice, self._joint(joint)])
+        mask = ~np.isnan(angle)
+        if below is not None:
+            mask &= angle < below
+        if above is not None:
+            mask &= angle > above
+        edges = np.diff(np.concatenate([[0], mask.view(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)  # exclusive
+        out = []
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            duration = float(timestamps[e - 1] - timestamps[s])
+            if duration < min_duration:
+                continue
+            span = angle[s:e]
+            out.append({
+                "joint": joint,
+                "start_sec": float(timestamps[s]),
+                "end_sec": float(timestamps[e - 1]),
+                "duration_sec": round(duration, 3),
+                "frames": e - s,
+                "min_angle": round(float(span.min()), 2),
+                "max_angle": round(float(span.max()), 2),
+            })
+        return out
+
+    def crossings(self, joint, threshold, start=None, end=None, direction="both"):
+        # Frames where the angle crosses threshold, linearly interpolated in time
+        rows_slice = self.time_slice(start, end)
+        timestamps = np.asarray(self.timestamps[rows_slice])
+        angle = np.asarray(self.angles[rows_slice, self._joint(joint)], dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(angle))
+        t, a = timestamps[valid], angle[valid]
+        above = a >= threshold
+        change = np.flatnonzero(above[1:] != above[:-1])
+        out = []
+        for i in change.tolist():
+            kind = "up" if above[i + 1] else "down"
+            if direction != "both" and kind != direction:
+                continue
+            frac = (threshold - a[i]) / (a[i + 1] - a[i]) if a[i + 1] != a[i] else 0.0
+            out.append({
+                "joint": joint,
+                "direction": kind,
+                "timestamp_sec": round(float(t[i] + frac * (t[i + 1] - t[i])), 3),
+                "angle_before": round(float(a[i]), 2),
+                "angle_after": round(float(a[i + 1]), 2),
+            })
+        return out
+
+    def stats(self, joints=None, start=None, end=None):
+        rows_slice = self.time_slice(start, end)
+        cols = [self._joint(joint) for joint in joints or self.joints]
+        block = np.asarray(self.angles[rows_slice][:, cols], dtype=np.float64)
+        out = []
+        for joint, values in zip(joints or self.joints, block.T):
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                out.append({"joint": joint, "frames": 0})
+                continue
+            p5, p50, p95 = np.percentile(values, [5, 50, 95])
+            out.append({
+                "joint": joint,
+                "frames": len(values),
+                "min": round(float(values.min()), 2),
+                "max": round(float(values.max()), 2),
+                "mean": round(float(values.mean()), 2),
+                "std": round(float(values.std()), 2),
+                "p5": round(float(p5), 2),
+                "median": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+            })
+        return out
+
+
+def print_rows(rows):
+    if not rows:
+        print("(no results)")
+        return
+    fields = list(rows[0])
+    widths = [max(len(f), *(len(str(r.get(f, ""))) for r in rows)) for f in fields]
+    print("  ".join(f.ljust(w) for f, w in zip(fields, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(f, "")).ljust(w) for f, w in zip(fields, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query joint angles in a pose joint CSV")
+    parser.add_argument("source", help="long or wide joint CSV, or a .csv.npz archive")
+    parser.add_argument("query", choices=["range", "below", "above", "crossings", "stats", "info"])
+    parser.add_argument("joint", nargs="?", help="joint for below / above / crossings")
+    parser.add_argument("threshold", nargs="?", type=float, help="angle in degrees")
+    parser.add_argument("--from", dest="start", type=float, help="start time (s)")
+    parser.add_argument("--to", dest="end", type=float, help="end time (s)")
+    parser.add_argument("--joints", nargs="+", help="joints for range / stats (default: all)")
+    parser.add_argument("--below", type=float, help="range: only angles below this")
+    parser.add_argument("--above", type=float, help="range: only angles above this")
+    parser.add_argument("--direction", choices=["up", "down", "both"], default="both")
+    parser.add_argument("--min-duration", type=float, default=0.0, help="below / above: shortest span (s)")
+    parser.add_argument("--store-dir", help="columnar store location (default <source>.cols)")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--csv", help="write results to CSV instead of printing")
+    parser.add_argument("--json", help="write results to JSON instead of printing")
+    args = parser.parse_args()
+
+    store = PoseStore.open(args.source, args.store_dir, args.rebuild)
+    if args.query in ("below", "above", "crossings") and (args.joint is None or args.threshold is None):
+        parser.error(f"{args.query} needs a joint and a threshold")
+
+    if args.query == "info":
+        ts = store.timestamps
+        rows = [{"frames": len(ts), "start_sec": float(ts[0]) if len(ts) else None,
+                 "end_sec": float(ts[-1]) if len(ts) else None, "joints": " ".join(store.joints)}]
+    elif args.query == "range":
+        rows = store.rows(args.joints, args.start, args.end, args.below, args.above)
+    elif args.query == "below":
+        rows = store.intervals(args.joint, args.start, args.end, below=args.threshold,
+                               min_duration=args.min_duration)
+    elif args.query == "above":
+        rows = store.intervals(args.joint, args.start, args.end, above=args.threshold,
+                               min_duration=args.min_duration)
+    elif args.query == "crossings":
+        rows = store.crossings(args.joint, args.threshold, args.start, args.end, args.direction)
+    else:
+        rows = store.stats(args.joints, args.start, args.end)
+
+    if args.csv:
+        write_csv_rows(args.csv, list(rows[0]) if rows else [], rows)
+        print(f"{len(rows)} rows saved to {args.csv}")
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"{len(rows)} rows saved to {args.json}")
+    else:
+        print_rows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import threading
+from collections import deque
+
+import numpy as np
+
+from posecommon import JOINT_SETS, LANDMARK_FIELDS
+
+# Local HTTP/WebSocket server for live pose frames.
+#
+# The capture loop calls server.publish(timestamp, landmarks_px, angles) once
+# per frame. The frame is encoded once into a compact little-endian binary
+# message and handed to every connected client's own bounded buffer; when a
+# client falls behind its oldest frames are dropped, so a slow viewer never
+# stalls inference. The server runs its asyncio loop on a background thread
+# and only needs the standard library.
+#
+#   GET /stream    WebSocket, one binary message per frame
+#   GET /snapshot  latest frame as JSON
+#   GET /stats     connected clients and dropped frames
+#
+# Binary frame layout (see encode_frame / decode_frame):
+#   uint32 seq, float64 timestamp_sec, uint16 n_landmarks, uint16 n_angles,
+#   float32[n_landmarks * 4] x, y, z, visibility, float32[n_angles] angles
+# n_landmarks is 0 for frames where nobody was detected.
+
+HEADER = struct.Struct("<IdHH")
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def encode_frame(seq, timestamp, landmarks, angles):
+    if landmarks is None:
+        lm = np.empty((0, 4), dtype="<f4")
+    else:
+        lm = np.asarray(landmarks, dtype="<f4").reshape(-1, 4)
+    ang = np.asarray(angles if angles is not None else [], dtype="<f4")
+    return HEADER.pack(seq, timestamp, len(lm), len(ang)) + lm.tobytes() + ang.tobytes()
+
+
+def decode_frame(data):
+    seq, timestamp, n_landmarks, n_angles = HEADER.unpack_from(data)
+    offset = HEADER.size
+    landmarks = np.frombuffer(data, dtype="<f4", count=n_landmarks * 4, offset=offset)
+    offset += n_landmarks * 16
+    angles = np.frombuffer(data, dtype="<f4", count=n_angles, offset=offset)
+    return seq, timestamp, landmarks.reshape(n_landmarks, 4), angles
+
+
+def ws_frame(payload, opcode=0x2):
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def ws_read(reader):
+    # One client frame -> (opcode, payload); client frames are always masked
+    b1, b2 = await reader.readexactly(2)
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if b2 & 0x80 else b"\0\0\0\0"
+    data = await reader.readexactly(n)
+    payload = bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+    return b1 & 0x0F, payload
+
+
+class Client:
+    def __init__(self, writer, buffer_frames):
+        self.writer = writer
+        self.frames = deque(maxlen=buffer_frames)
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, message):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(message)
+        self.ready.set()
+
+
+class PoseStreamServer:
+    def __init__(self, host="127.0.0.1", port=8765, client_buffer=8, joint_names=None):
+        self.host = host
+        self.port = port
+        self.client_buffer = client_buffer
+        self.joint_names = list(joint_names or JOINT_SETS)
+        self.clients = set()
+        self.seq = 0
+        self.latest = None
+        self.loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self._start_error = None
+
+    # --- capture-loop side (any thread) ---
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="pose-stream", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._start_error is not None:
+            # e.g. the port is already in use; the server thread has already exited
+            self._thread.join()
+            raise self._start_error
+        print(f"Pose stream on ws://{self.host}:{self.port}/stream "
+              f"(snapshot: http://{self.host}:{self.port}/snapshot)")
+        return self
+
+    def publish(self, timestamp, landmarks, angles=None):
+        # Never blocks: encode once, fan out on the server loop
+        self.seq += 1
+        message = encode_frame(self.seq, timestamp, landmarks, angles)
+        self.latest = (self.seq, timestamp, landmarks, angles)
+        if self.loop is not None and self.clients:
+            self.loop.call_soon_threadsafe(self._fan_out, message)
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=2)
+
+    # --- server loop ---
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.loop = loop
+        except Exception as e:
+            self._start_error = e
+            loop.close()
+            return
+        finally:
+            self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self._server.close()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def _fan_out(self, message):
+        for client in self.clients:
+            client.offer(message)
+
+    def snapshot(self):
+        if self.latest is None:
+            return {"seq": 0}
+        seq, timestamp, landmarks, angles = self.latest
+        keypoints = []
+        if landmarks is not None:
+            for idx, values in enumerate(np.asarray(landmarks, dtype=float).reshape(-1, 4).tolist()):
+                kp = {"id": idx}
+                kp.update(zip(LANDMARK_FIELDS, (round(v, 4) for v in values)))
+                keypoints.append(kp)
+        angle_map = {}
+        if angles is not None:
+            angle_map = {name: round(float(a), 2) for name, a in zip(self.joint_names, angles)}
+        return {"seq": seq, "timestamp_sec": timestamp, "keypoints": keypoints, "angles": angle_map}
+
+    def stats(self):
+        return {
+            "frames_published": self.seq,
+            "clients": [{"sent": c.sent, "dropped": c.dropped, "buffered": len(c.frames)}
+                        for c in self.clients],
+        }
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        lines = request.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        path = parts[1] if len(parts) > 1 else "/"
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        if path == "/stream" and headers.get("upgrade", "").lower() == "websocket":
+            await self._websocket(reader, writer, headers)
+        elif path == "/snapshot":
+            await self._respond(writer, 200, self.snapshot())
+        elif path == "/stats":
+            await self._respond(writer, 200, self.stats())
+        else:
+            await self._respond(writer, 404, {"error": "not found",
+                                              "endpoints": ["/stream", "/snapshot", "/stats"]})
+
+    async def _respond(self, writer, status, payload):
+        body = json.dumps(payload).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            await self._respond(writer, 400, {"error": "missing Sec-WebSocket-Key"})
+            return
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WS_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        await writer.drain()
+
+        client = Client(writer, self.client_buffer)
+        self.clients.add(client)
+        sender = asyncio.ensure_future(self._send_loop(client))
+        try:
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == 0x8:
+                    writer.write(ws_frame(payload[:2], 0x8))
+                    break
+                if opcode == 0x9:
+                    writer.write(ws_frame(payload, 0xA))
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+            writer.close()
+
+    async def _send_loop(self, client):
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+                while client.frames:
+                    client.writer.write(ws_frame(client.frames.popleft()))
+                    client.sent += 1
+                    await client.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
@@ -0,0 +1,210 @@
+import argparse
+import struct
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from posecommon import JOINT_SETS, NUM_LANDMARKS
+
+# Shared-memory fan-out of live pose frames to local consumer processes.
+#
+# One capture process (the producer) writes every frame's landmarks, joint
+# angles and metadata into a multiprocessing.shared_memory ring buffer. Any
+# number of consumers (CSV writer, playback overlay, servo driver, analytics)
+# attach by name and read the slots directly: no second camera, no second
+# MediaPipe graph, no serialization.
+#
+# Block layout: header (magic, capacity, n_angles, write_seq) followed by
+# `capacity` slots of
+#   uint64 seq_begin, float64 timestamp, uint32 detected, uint32 width,
+#   uint32 height, uint32 pad, float32[33 * 4] landmarks, float32[n_angles]
+#   angles, uint64 seq_end
+# The producer bumps seq_begin, writes the payload, then sets seq_end; a
+# reader accepts a slot only if both match the sequence it expected, so torn
+# reads are detected without locks. Consumers that fall more than `capacity`
+# frames behind skip ahead and count the overrun.
+#
+#   producer:  ring = PoseRingProducer("pose_ring"); ring.write(ts, lm_px, angles, (w, h))
+#   consumer:  python sharedposering.py pose_ring --csv pose_joint_data_ring.csv
+
+MAGIC = 0x50524E47  # "PRNG"
+HEADER = struct.Struct("<IIIIQ")  # magic, capacity, n_angles, slot_size, write_seq
+SLOT_META = struct.Struct("<QdIIII")  # seq_begin, timestamp, detected, width, height, pad
+
+
+def slot_size(n_angles):
+    return SLOT_META.size + (NUM_LANDMARKS * 4 + n_angles) * 4 + 8
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before 3.13 every attach is registered with the resource tracker and
+        # unlinked when the consumer exits; skip the registration instead
+        from multiprocessing import resource_tracker
+
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class _Ring:
+    def _map(self):
+        buf = self.shm.buf
+        magic, self.capacity, self.n_angles, self.slot_size, _ = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise RuntimeError(f"{self.shm.name} is not a pose ring buffer")
+        self.header = np.ndarray((1,), dtype="<u8", buffer=buf, offset=HEADER.size - 8)
+        base = HEADER.size
+        self.slots = []
+        for i in range(self.capacity):
+            off = base + i * self.slot_size
+            lm_off = off + SLOT_META.size
+            ang_off = lm_off + NUM_LANDMARKS * 16
+            end_off = ang_off + self.n_angles * 4
+            self.slots.append((
+                off,
+                np.ndarray((NUM_LANDMARKS, 4), dtype="<f4", buffer=buf, offset=lm_off),
+                np.ndarray((self.n_angles,), dtype="<f4", buffer=buf, offset=ang_off),
+                np.ndarray((1,), dtype="<u8", buffer=buf, offset=end_off),
+            ))
+
+    @property
+    def write_seq(self):
+        return int(self.header[0])
+
+
+class PoseRingProducer(_Ring):
+    def __init__(self, name="pose_ring", capacity=256, n_angles=len(JOINT_SETS)):
+        size = HEADER.size + capacity * slot_size(n_angles)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Stale ring from a crashed producer: take it over
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, capacity, n_angles, slot_size(n_angles), 0)
+        self._map()
+
+    def write(self, timestamp, landmarks=None, angles=None, frame_size=(0, 0)):
+        seq = self.write_seq + 1
+        off, lm_view, ang_view, end_view = self.slots[seq % self.capacity]
+        detected = landmarks is not None
+        SLOT_META.pack_into(self.shm.buf, off, seq, timestamp, int(detected),
+                            int(frame_size[0]), int(frame_size[1]), 0)
+        if detected:
+            lm_view[:] = landmarks
+        # Slots are reused every `capacity` frames: angles not given this frame are NaN, not stale
+        ang_view[:] = np.nan
+        if angles is not None:
+            ang_view[:len(angles)] = angles
+        end_view[0] = seq
+        self.header[0] = seq
+        return seq
+
+    def close(self, unlink=True):
+        del self.header, self.slots
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class PoseRingConsumer(_Ring):
+    def __init__(self, name="pose_ring", start="latest"):
+        self.shm = _attach(name)
+        self._map()
+        # start="latest" only sees new frames, start="oldest" replays what is still buffered
+        newest = self.write_seq
+        self.next_seq = newest + 1 if start == "latest" else max(1, newest - self.capacity + 1)
+        self.overruns = 0
+
+    def _read_slot(self, seq, copy):
+        off, lm_view, ang_view, end_view = self.slots[seq % self.capacity]
+        seq_begin, timestamp, detected, width, height, _ = SLOT_META.unpack_from(self.shm.buf, off)
+        if seq_begin != seq or int(end_view[0]) != seq:
+            return None
+        landmarks = (lm_view.copy() if copy else lm_view) if detected else None
+        angles = (ang_view.copy() if copy else ang_view) if detected else None
+        # Re-check: the producer may have lapped us while copying
+        if copy and (SLOT_META.unpack_from(self.shm.buf, off)[0] != seq or int(end_view[0]) != seq):
+            return None
+        return seq, timestamp, landmarks, angles, (width, height)
+
+    def read_next(self, timeout=None, copy=True, poll=0.0005):
+        # Next frame in order: (seq, timestamp, landmarks or None, angles or None, (w, h)), or None on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            newest = self.write_seq
+            if newest >= self.next_seq:
+                if newest - self.next_seq >= self.capacity:
+                    skipped = newest - self.capacity + 1 - self.next_seq
+                    self.overruns += skipped
+                    self.next_seq += skipped
+                frame = self._read_slot(self.next_seq, copy)
+                self.next_seq += 1
+                if frame is not None:
+                    return frame
+                self.overruns += 1
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def read_latest(self, copy=True):
+        newest = self.write_seq
+        if newest == 0:
+            return None
+        self.next_seq = newest + 1
+        return self._read_slot(newest, copy)
+
+    def close(self):
+        del self.header, self.slots
+        self.shm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consume live pose frames from a shared-memory ring")
+    parser.add_argument("name", nargs="?", default="pose_ring")
+    parser.add_argument("--csv", help="write frames to this joint CSV")
+    parser.add_argument("--csv-layout", choices=["long", "wide"], default="long")
+    parser.add_argument("--idle-timeout", type=float, default=5.0,
+                        help="stop after this many seconds without frames")
+    args = parser.parse_args()
+
+    ring = PoseRingConsumer(args.name, start="oldest")
+    writer = None
+    if args.csv:
+        from bulkcsvwriter import JointCsvWriter
+
+        writer = JointCsvWriter(args.csv, layout=args.csv_layout)
+
+    frames = 0
+    started = time.perf_counter()
+    try:
+        while True:
+            frame = ring.read_next(timeout=args.idle_timeout)
+            if frame is None:
+                break
+            seq, timestamp, landmarks, angles, _ = frame
+            frames += 1
+            if writer is not None and landmarks is not None:
+                writer.add_frame(timestamp, landmarks)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if writer is not None:
+            writer.close()
+        ring.close()
+    elapsed = time.perf_counter() - started
+    print(f"Read {frames} frames in {elapsed:.1f}s, {ring.overruns} lost to overruns")
+
+
+if __name__ == "__main__":
+    main()
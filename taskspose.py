@@ -0,0 +1,246 @@
+import argparse
+import json
+import platform
+import queue
+import threading
+import time
+
+import numpy as np
+
+from posecommon import DEFAULT_POSE_SETTINGS, NUM_LANDMARKS, arrays_to_pose_json, landmarks_to_array, to_pixels
+
+# Offline pose inference on the MediaPipe Tasks PoseLandmarker (VIDEO mode).
+#
+# Frames are decoded on the main thread and handed round-robin to several
+# PoseLandmarker instances, each on its own worker thread. detect_for_video()
+# runs in C++ without the GIL, so N instances keep N cores busy on a single
+# video without the cost of extra processes. Each instance sees every N-th
+# frame with strictly increasing timestamps, as VIDEO mode requires, and
+# tracks across the frames it is given.
+#
+# The Tasks Python API has no intra-op thread setting, so parallelism comes
+# from the number of instances (--instances).
+#
+# Needs a model bundle from the MediaPipe model page, e.g.
+# pose_landmarker_full.task (--model-complexity picks lite / full / heavy).
+#
+#   python taskspose.py kannadu.mp4 --instances 4 --csv pose_joint_data.csv --json pose_data.json
+#   python taskspose.py kannadu.mp4 --bench --instances 1 2 4 --max-frames 600
+
+MODEL_FILES = {0: "pose_landmarker_lite.task", 1: "pose_landmarker_full.task",
+               2: "pose_landmarker_heavy.task"}
+
+
+def tasks_landmarks_to_array(result):
+    # PoseLandmarkerResult -> (33, 4) normalized float32 for the first person, or None
+    if not result.pose_landmarks:
+        return None
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in result.pose_landmarks[0]],
+                    dtype=np.float32)
+
+
+class TasksPoseBackend:
+    def __init__(self, model_path, instances=1, min_detection_confidence=0.7,
+                 min_presence_confidence=0.5, min_tracking_confidence=0.7, queue_size=4):
+        self.model_path = model_path
+        self.instances = instances
+        self.min_detection_confidence = min_detection_confidence
+        self.min_presence_confidence = min_presence_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.queue_size = queue_size
+
+    def _create(self):
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python import vision
+
+        options = vision.PoseLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=self.model_path),
+            running_mode=vision.RunningMode.VIDEO,
+            num_poses=1,
+            min_pose_detection_confidence=self.min_detection_confidence,
+            min_pose_presence_confidence=self.min_presence_confidence,
+            min_tracking_confidence=self.min_tracking_confidence,
+        )
+        return vision.PoseLandmarker.create_from_options(options)
+
+    def _worker(self, landmarker, frames, results, errors):
+        import mediapipe as mp
+
+        try:
+            while True:
+                item = frames.get()
+                if item is None:
+                    break
+                idx, timestamp_ms, rgb = item
+                image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+                results[idx] = tasks_landmarks_to_array(landmarker.detect_for_video(image, timestamp_ms))
+        except Exception as e:
+            errors.append(e)
+            # Keep draining so the decoder never blocks on a dead worker
+            while frames.get() is not None:
+                pass
+
+    def process_video(self, video_path, max_frames=None):
+        # -> timestamps (N,), normalized landmarks (N, 33, 4) NaN where nobody was found, fps, (w, h)
+        import cv2
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError("Could not open video file.")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+        # VIDEO mode timestamps must restart per video, so instances live for one video
+        landmarkers = [self._create() for _ in range(self.instances)]
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in landmarkers]
+        results = {}
+        errors = []
+        workers = [threading.Thread(target=self._worker, args=(lm, q, results, errors), daemon=True)
+                   for lm, q in zip(landmarkers, queues)]
+        for worker in workers:
+            worker.start()
+
+        frame_idx = 0
+        try:
+            while max_frames is None or frame_idx < max_frames:
+                ret, frame = cap.read()
+                if not ret or errors:
+                    break
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                timestamp_ms = int(round(frame_idx * 1000.0 / fps))
+                queues[frame_idx % len(queues)].put((frame_idx, timestamp_ms, rgb))
+                frame_idx += 1
+        finally:
+            for q in queues:
+                q.put(None)
+            for worker in workers:
+                worker.join()
+            for landmarker in landmarkers:
+                landmarker.close()
+            cap.release()
+        if errors:
+            raise errors[0]
+
+        landmarks = np.full((frame_idx, NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+        for idx, frame_landmarks in results.items():
+            if frame_landmarks is not None:
+                landmarks[idx] = frame_landmarks
+        timestamps = np.round(np.arange(frame_idx) / fps, 3)
+        return timestamps, landmarks, fps, frame_size
+
+
+def legacy_process(video_path, pose_settings=None, max_frames=None):
+    # The current mp.solutions.pose path, same return values as process_video
+    import cv2
+    import mediapipe as mp
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("Could not open video file.")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    pose = mp.solutions.pose.Pose(**dict(DEFAULT_POSE_SETTINGS, **(pose_settings or {})))
+    frames = []
+    while max_frames is None or len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        lm = landmarks_to_array(pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).pose_landmarks)
+        frames.append(lm if lm is not None else np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32))
+    cap.release()
+    pose.close()
+    landmarks = np.array(frames, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 4)
+    return np.round(np.arange(len(frames)) / fps, 3), landmarks, fps, frame_size
+
+
+def benchmark(video_path, model_path, instance_counts, max_frames=None, pose_settings=None):
+    pose_settings = dict(DEFAULT_POSE_SETTINGS, **(pose_settings or {}))
+
+    def run(name, fn):
+        started = time.perf_counter()
+        timestamps, landmarks, _, _ = fn()
+        elapsed = time.perf_counter() - started
+        detected = int((~np.isnan(landmarks[:, :, 0]).all(axis=1)).sum())
+        print(f"  {name:<22} {len(landmarks) / elapsed:7.1f} fps  ({len(landmarks)} frames, "
+              f"{detected} with a person, {elapsed:.1f}s)")
+        return landmarks, {"name": name, "frames": len(landmarks), "detected": detected,
+                           "seconds": round(elapsed, 3), "fps": round(len(landmarks) / elapsed, 2)}
+
+    print(f"Benchmarking {video_path}")
+    reference, legacy = run("mp_pose.Pose", lambda: legacy_process(video_path, pose_settings, max_frames))
+    runs = [legacy]
+    for count in instance_counts:
+        backend = TasksPoseBackend(model_path, count,
+                                   min_detection_confidence=pose_settings["min_detection_confidence"],
+                                   min_tracking_confidence=pose_settings["min_tracking_confidence"])
+        landmarks, stats = run(f"tasks x{count}", lambda: backend.process_video(video_path, max_frames))
+        # Agreement with the legacy path, in normalized image coordinates
+        n = min(len(landmarks), len(reference))
+        diff = np.abs(landmarks[:n, :, :2] - reference[:n, :, :2])
+        both = ~np.isnan(diff).any(axis=(1, 2))
+        stats["mean_abs_diff_vs_legacy"] = round(float(diff[both].mean()), 5) if both.any() else None
+        stats["speedup_vs_legacy"] = round(stats["fps"] / legacy["fps"], 2)
+        runs.append(stats)
+    return {
+        "video": video_path,
+        "model": model_path,
+        "max_frames": max_frames,
+        "machine": platform.platform(),
+        "processor": platform.processor(),
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pose inference with MediaPipe Tasks")
+    parser.add_argument("video")
+    parser.add_argument("--model", help="PoseLandmarker .task bundle (default from --model-complexity)")
+    parser.add_argument("--model-complexity", type=int, default=1, choices=sorted(MODEL_FILES))
+    parser.add_argument("--instances", type=int, nargs="+", default=[2],
+                        help="graph instances (several values with --bench)")
+    parser.add_argument("--min-detection-confidence", type=float, default=0.7)
+    parser.add_argument("--min-tracking-confidence", type=float, default=0.7)
+    parser.add_argument("--max-frames", type=int)
+    parser.add_argument("--csv", help="write the joint CSV with angles")
+    parser.add_argument("--csv-layout", choices=["long", "wide"], default="long")
+    parser.add_argument("--json", help="write pose_data.json-style keypoints + edges")
+    parser.add_argument("--bench", action="store_true", help="compare against mp_pose.Pose")
+    parser.add_argument("--bench-output", default="taskspose_bench.json")
+    args = parser.parse_args()
+
+    model_path = args.model or MODEL_FILES[args.model_complexity]
+    if args.bench:
+        report = benchmark(args.video, model_path, args.instances, args.max_frames, {
+            "model_complexity": args.model_complexity,
+            "min_detection_confidence": args.min_detection_confidence,
+            "min_tracking_confidence": args.min_tracking_confidence,
+        })
+        with open(args.bench_output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark saved to {args.bench_output}")
+        return
+
+    backend = TasksPoseBackend(model_path, args.instances[0],
+                               min_detection_confidence=args.min_detection_confidence,
+                               min_tracking_confidence=args.min_tracking_confidence)
+    started = time.perf_counter()
+    timestamps, landmarks, fps, (w, h) = backend.process_video(args.video, args.max_frames)
+    elapsed = time.perf_counter() - started
+    print(f"Processed {len(landmarks)} frames in {elapsed:.1f}s "
+          f"({len(landmarks) / elapsed if elapsed else 0:.1f} fps, {args.instances[0]} instances)")
+
+    landmarks = to_pixels(landmarks, w, h)
+    if args.csv:
+        from bulkcsvwriter import JointCsvWriter
+
+        with JointCsvWriter(args.csv, layout=args.csv_layout) as writer:
+            writer.add_frames(timestamps, landmarks)
+        print(f"Joint data saved to {args.csv}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(arrays_to_pose_json(timestamps, landmarks, with_edges=True), f, indent=2)
+        print(f"Pose data saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import json
+
+import numpy as np
+
+from posecommon import JOINT_SETS, NUM_LANDMARKS, joint_angles
+
+# Multi-view 3D triangulation of landmarks from calibrated cameras.
+#
+# Calibration is one JSON file per camera:
+#   {"K": [[fx, 0, cx], [0, fy, cy], [0, 0, 1]],
+#    "dist": [k1, k2, p1, p2, k3],          # optional
+#    "R": [[...], [...], [...]] or "rvec": [rx, ry, rz],
+#    "t": [tx, ty, tz]}                      # world -> camera
+#
+# All 33 landmarks of every frame are solved with one batched linear (DLT)
+# system: each view contributes two rows per landmark, weighted by the
+# landmark visibility, and the 4x4 normal matrices are solved together with
+# np.linalg.eigh. Landmarks seen by fewer than two views come out NaN.
+#
+#   python triangulate.py multi_view.npz --calib cam0.json cam1.json \
+#       --out pose_3d.npz --csv pose_joint_angles_3d.csv
+
+
+def rodrigues(rvec):
+    rvec = np.asarray(rvec, dtype=np.float64)
+    theta = np.linalg.norm(rvec)
+    if theta == 0:
+        return np.eye(3)
+    k = rvec / theta
+    kx = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+    return np.eye(3) + np.sin(theta) * kx + (1 - np.cos(theta)) * kx @ kx
+
+
+class CameraCalibration:
+    def __init__(self, K, R, t, dist=None, name=None):
+        self.name = name
+        self.K = np.asarray(K, dtype=np.float64)
+        self.R = np.asarray(R, dtype=np.float64)
+        self.t = np.asarray(t, dtype=np.float64).reshape(3)
+        self.dist = np.asarray(dist, dtype=np.float64) if dist is not None else None
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        R = data["R"] if "R" in data else rodrigues(data["rvec"])
+        return cls(data["K"], R, data["t"], data.get("dist"), data.get("name", path))
+
+    @property
+    def projection(self):
+        return self.K @ np.hstack([self.R, self.t[:, None]])
+
+    def undistort(self, points):
+        # (..., 2) pixel coords -> undistorted pixel coords (no-op without dist)
+        if self.dist is None or not np.any(self.dist):
+            return points
+        import cv2
+
+        flat = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        out = cv2.undistortPoints(flat, self.K, self.dist, P=self.K)
+        return out.reshape(np.shape(points))
+
+
+class Triangulator:
+    def __init__(self, calibrations, min_visibility=0.5):
+        self.calibrations = calibrations
+        self.P = np.stack([c.projection for c in calibrations])  # (V, 3, 4)
+        self.min_visibility = min_visibility
+
+    def _observations(self, landmarks):
+        # landmarks: (..., V, 33, >=2) pixel coords (+ visibility in [..., 3])
+        # -> undistorted xy (..., V, 33, 2), weights (..., V, 33); 0 weight = not used
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        xy = np.stack([c.undistort(landmarks[..., v, :, :2])
+                       for v, c in enumerate(self.calibrations)], axis=-3)
+        if landmarks.shape[-1] > 3:
+            weights = landmarks[..., 3].copy()
+        else:
+            weights = np.ones(landmarks.shape[:-1])
+        weights[~(weights >= self.min_visibility)] = 0.0
+        weights[np.isnan(xy).any(axis=-1)] = 0.0
+        return xy, weights
+
+    def __call__(self, landmarks):
+        xy, weights = self._observations(landmarks)
+        return triangulate_dlt(np.nan_to_num(xy), self.P, weights)
+
+    def reprojection_error(self, points3d, landmarks):
+        # Mean pixel error per view over the observations the triangulation used
+        xy, weights = self._observations(landmarks)
+        proj = project(points3d, self.P)  # (..., V, 33, 2)
+        err = np.linalg.norm(proj - xy, axis=-1)
+        err[weights == 0] = np.nan
+        axes = tuple(i for i in range(err.ndim) if i != err.ndim - 2)
+        return np.nanmean(err, axis=axes)
+
+
+def triangulate_dlt(xy, P, weights):
+    # xy (..., V, 33, 2), P (V, 3, 4), weights (..., V, 33) -> (..., 33, 3)
+    # Rows x * P[2] - P[0] and y * P[2] - P[1], per view and landmark
+    P = np.asarray(P, dtype=np.float64)
+    x = xy[..., 0, None]
+    y = xy[..., 1, None]
+    p0, p1, p2 = P[:, None, 0, :], P[:, None, 1, :], P[:, None, 2, :]  # (V, 1, 4)
+    rows = np.stack([x * p2 - p0, y * p2 - p1], axis=-2)  # (..., V, 33, 2, 4)
+    # Normalize rows so views with large pixel coords don't dominate
+    norms = np.linalg.norm(rows, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    rows = rows / norms * weights[..., None, None]
+    # Sum of outer products over views and both rows: (..., 33, 4, 4)
+    ata = np.einsum("...vlri,...vlrj->...lij", rows, rows)
+    _, vecs = np.linalg.eigh(ata)
+    X = vecs[..., :, 0]  # eigenvector of the smallest eigenvalue
+    with np.errstate(invalid="ignore", divide="ignore"):
+        points = X[..., :3] / X[..., 3:4]
+    valid = (weights > 0).sum(axis=-2) >= 2  # (..., 33)
+    points[~valid] = np.nan
+    return points
+
+
+def project(points3d, P):
+    # (..., 33, 3) -> (..., V, 33, 2)
+    homog = np.concatenate([points3d, np.ones(points3d.shape[:-1] + (1,))], axis=-1)
+    proj = np.einsum("vij,...lj->...vli", P, homog)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return proj[..., :2] / proj[..., 2:3]
+
+
+def write_angle_csv(path, timestamps, angles, joint_sets=JOINT_SETS):
+    # Long timestamp_sec,joint,angle_deg rows; frames without a 3D angle are skipped
+    names = list(joint_sets)
+    with open(path, "w", newline="") as f:
+        f.write("timestamp_sec,joint,angle_deg\n")
+        for ts, frame_angles in zip(timestamps.tolist(), angles.tolist()):
+            f.write("".join(f"{ts},{name},{angle}\n" for name, angle in zip(names, frame_angles)
+                            if angle == angle))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Triangulate multi-view landmarks to 3D")
+    parser.add_argument("views", help="merged .npz from multicamcapture.py")
+    parser.add_argument("--calib", nargs="+", required=True, help="one calibration JSON per view")
+    parser.add_argument("--min-visibility", type=float, default=0.5)
+    parser.add_argument("--out", default="pose_3d.npz")
+    parser.add_argument("--csv", help="write 3D joint angles as timestamp_sec,joint,angle_deg")
+    args = parser.parse_args()
+
+    data = np.load(args.views)
+    landmarks = data["landmarks"]  # (N, V, 33, 4)
+    if landmarks.shape[1] != len(args.calib):
+        raise ValueError(f"{landmarks.shape[1]} views but {len(args.calib)} calibration files")
+
+    triangulator = Triangulator([CameraCalibration.load(p) for p in args.calib],
+                                min_visibility=args.min_visibility)
+    points3d = triangulator(landmarks)
+    angles = joint_angles(points3d, dims=3)
+    errors = triangulator.reprojection_error(points3d, landmarks)
+
+    np.savez_compressed(args.out, timestamps=data["timestamps"], points3d=points3d.astype(np.float32),
+                        angles=angles.astype(np.float32), joints=np.array(list(JOINT_SETS)))
+    print(f"Triangulated {len(points3d)} frames x {NUM_LANDMARKS} landmarks to {args.out}")
+    print("Mean reprojection error per view (px): "
+          + ", ".join(f"{e:.2f}" for e in np.atleast_1d(errors)))
+    if args.csv:
+        write_angle_csv(args.csv, data["timestamps"], angles)
+        print(f"3D joint angles saved to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
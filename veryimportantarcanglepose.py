@@ -2,9 +2,10 @@ import cv2
 import time
 import csv
 import math
-import json
 import mediapipe as mp
-from collections import defaultdict
+from poseprofiler import FrameProfiler
+from bulkcsvwriter import JointCsvWriter
+from posecommon import DIFF_CSV_FIELDS, JsonListWriter, StreamingPoseDiff, landmarks_to_array, to_pixels
 
 # Setup MediaPipe
 mp_pose = mp.solutions.pose
@@ -22,16 +23,49 @@ if not cap.isOpened():
 
 fps = 30  # Assuming 30 FPS webcam feed
 
-# CSV & JSON Setup
-pose_data_json = []
+# CSV & JSON Setup (frames are written as they arrive, nothing accumulates in memory)
+pose_data_json = JsonListWriter("pose_data_webcam.json")
 csv_filename = "pose_joint_data_webcam.csv"
-csv_fields = ["timestamp_sec", "joint", "x", "y", "angle_deg"]
-csv_file = open(csv_filename, mode="w", newline="")
-csv_writer = csv.DictWriter(csv_file, fieldnames=csv_fields)
-csv_writer.writeheader()
-
-# For difference recording
-keypoint_log_by_time = defaultdict(list)
+csv_layout = "long"  # "wide" writes one row per frame, several times smaller
+csv_writer = JointCsvWriter(csv_filename, layout=csv_layout)
+
+# For difference recording: 5 s displacement rows are written as soon as their end second arrives
+keypoint_diff = StreamingPoseDiff(window=5)
+diff_csv_file = open("pose_diff_5s_webcam.csv", "w", newline="")
+diff_csv_writer = csv.DictWriter(diff_csv_file, fieldnames=DIFF_CSV_FIELDS)
+diff_csv_writer.writeheader()
+diff_json = JsonListWriter("pose_diff_5s_webcam.json")
+
+# Profiling (per-stage timings, summary written at exit)
+profile_summary_path = "pose_profile_summary_webcam.json"
+profile_trace_path = None  # e.g. "pose_profile_trace_webcam.jsonl" for per-frame timings
+profiler = FrameProfiler(profile_trace_path)
+
+# Live stream for dashboards / servo bridge (ws://127.0.0.1:<port>/stream)
+stream_port = None  # e.g. 8765
+stream_server = None
+if stream_port:
+    from posestreamserver import PoseStreamServer
+    stream_server = PoseStreamServer(port=stream_port).start()
+
+# Annotated video export, encoded on a background thread (frames are dropped, not waited for,
+# if the encoder falls behind)
+annotated_video_path = None  # e.g. "pose_annotated_webcam.mp4"
+annotated_writer = None
+
+# Shared-memory ring for local consumers (python sharedposering.py <name> --csv ...)
+shared_ring_name = None  # e.g. "pose_ring"
+shared_ring = None
+if shared_ring_name:
+    from sharedposering import PoseRingProducer
+    shared_ring = PoseRingProducer(shared_ring_name)
+
+# Compact delta-encoded recording (python posecodec.py decode <path> --json ... to expand)
+delta_recording_path = None  # e.g. "pose_data_webcam.posez"
+delta_recording = None
+if delta_recording_path:
+    from posecodec import PoseDeltaWriter
+    delta_recording = PoseDeltaWriter(delta_recording_path, keyframe_interval=fps)
 
 def calculate_angle(a, b, c):
     ba = [a[0] - b[0], a[1] - b[1]]
@@ -55,19 +89,21 @@ joint_sets = {
     "right_knee": (mp_pose.PoseLandmark.RIGHT_HIP, mp_pose.PoseLandmark.RIGHT_KNEE, mp_pose.PoseLandmark.RIGHT_ANKLE)
 }
 
-landmark_names = {lm.value: lm.name for lm in mp_pose.PoseLandmark}
-
 frame_idx = 0
 start_time = time.time()
 
 while True:
+    profiler.start_frame()
     ret, frame = cap.read()
     if not ret:
         break
+    profiler.lap("decode")
 
     timestamp = round(time.time() - start_time, 3)
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    profiler.lap("color")
     results = pose.process(frame_rgb)
+    profiler.lap("inference")
 
     if results.pose_landmarks:
         h, w = frame.shape[:2]
@@ -84,105 +120,88 @@ while True:
                 "z": z,
                 "visibility": round(lm.visibility, 3)
             })
-            csv_writer.writerow({
-                "timestamp_sec": timestamp,
-                "joint": landmark_names.get(idx, f"id_{idx}"),
-                "x": x,
-                "y": y,
-                "angle_deg": ""
-            })
+        csv_writer.add_frame(timestamp, list(lm_dict.values()))
+        profiler.lap("serialize")
 
+        frame_angles = []
         for name, (a_idx, b_idx, c_idx) in joint_sets.items():
             if a_idx.value in lm_dict and b_idx.value in lm_dict and c_idx.value in lm_dict:
                 angle = calculate_angle(lm_dict[a_idx.value], lm_dict[b_idx.value], lm_dict[c_idx.value])
+                frame_angles.append(angle)
                 bx, by = lm_dict[b_idx.value]
-                csv_writer.writerow({
-                    "timestamp_sec": timestamp,
-                    "joint": name,
-                    "x": bx,
-                    "y": by,
-                    "angle_deg": angle
-                })
+                profiler.lap("angles")
                 cv2.putText(frame, f"{angle}°", (bx + 10, by - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
                 cv2.ellipse(frame, (bx, by), (20, 20), 0, 0, angle, (255, 0, 255), 2)
+                profiler.lap("draw")
 
-        pose_data_json.append({
+        pose_data_json.write({
             "timestamp_sec": timestamp,
             "keypoints": keypoints_frame
         })
 
-        keypoint_log_by_time[round(timestamp)][0:0] = keypoints_frame
+        diff_rows, diff_json_rows = keypoint_diff.add(timestamp, keypoints_frame)
+        diff_csv_writer.writerows(diff_rows)
+        for row in diff_json_rows:
+            diff_json.write(row)
+        if stream_server is not None or shared_ring is not None or delta_recording is not None:
+            landmarks_px = to_pixels(landmarks_to_array(results.pose_landmarks), w, h)
+            if stream_server is not None:
+                stream_server.publish(timestamp, landmarks_px, frame_angles)
+            if shared_ring is not None:
+                shared_ring.write(timestamp, landmarks_px, frame_angles, (w, h))
+            if delta_recording is not None:
+                delta_recording.write(timestamp, landmarks_px)
+        profiler.lap("serialize")
 
         mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+        profiler.lap("draw")
+    else:
+        if stream_server is not None:
+            stream_server.publish(timestamp, None)
+        if shared_ring is not None:
+            shared_ring.write(timestamp, None, None, frame.shape[1::-1])
+        if delta_recording is not None:
+            delta_recording.write(timestamp, None)
+
+    if annotated_video_path:
+        if annotated_writer is None:
+            from annotatedexport import BackgroundVideoWriter
+            annotated_writer = BackgroundVideoWriter(annotated_video_path, fps, frame.shape[1::-1],
+                                                     drop_when_full=True)
+        annotated_writer.write(frame)
 
     cv2.imshow("Live Pose Estimation", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    key = cv2.waitKey(1) & 0xFF
+    profiler.lap("display")
+    profiler.end_frame()
+    if key == ord('q'):
         break
 
     frame_idx += 1
 
-# Save raw pose JSON
-with open("pose_data_webcam.json", "w") as f:
-    json.dump(pose_data_json, f, indent=2)
-
-# Save displacement every 5 seconds
-timestamps = sorted(keypoint_log_by_time.keys())
-json_diff = []
-csv_diff_rows = []
-
-for i in range(0, len(timestamps)-1):
-    t1 = timestamps[i]
-    t2 = round(t1 + 5.0, 3)
-    if t2 not in keypoint_log_by_time:
-        continue
-
-    kps1 = {kp["id"]: kp for kp in keypoint_log_by_time[t1]}
-    kps2 = {kp["id"]: kp for kp in keypoint_log_by_time[t2]}
-
-    for idx in kps1:
-        if idx in kps2:
-            start = kps1[idx]
-            end = kps2[idx]
-            dx = round(end["x"] - start["x"], 2)
-            dy = round(end["y"] - start["y"], 2)
-            dz = round(end["z"] - start["z"], 4)
-            csv_diff_rows.append({
-                "timestamp_start": t1,
-                "timestamp_end": t2,
-                "keypoint_id": idx,
-                "x_start": start["x"],
-                "y_start": start["y"],
-                "z_start": start["z"],
-                "x_end": end["x"],
-                "y_end": end["y"],
-                "z_end": end["z"],
-                "dx": dx,
-                "dy": dy,
-                "dz": dz
-            })
-            json_diff.append({
-                "keypoint_id": idx,
-                "from_timestamp": t1,
-                "to_timestamp": t2,
-                "start_pos": [start["x"], start["y"], start["z"]],
-                "end_pos": [end["x"], end["y"], end["z"]],
-                "diff": [dx, dy, dz]
-            })
-
-# Save CSV and JSON
-with open("pose_diff_5s_webcam.csv", "w", newline="") as f:
-    writer = csv.DictWriter(f, fieldnames=csv_diff_rows[0].keys())
-    writer.writeheader()
-    writer.writerows(csv_diff_rows)
-
-with open("pose_diff_5s_webcam.json", "w") as f:
-    json.dump(json_diff, f, indent=2)
+# Close pose JSON and displacement files
+pose_data_json.close()
+diff_csv_file.close()
+diff_json.close()
 
 # Cleanup
 cap.release()
 cv2.destroyAllWindows()
 pose.close()
-csv_file.close()
-
-print(f"Saved live pose data to:\n- {csv_filename}\n- pose_data_webcam.json\n- pose_diff_5s_webcam.csv\n- pose_diff_5s_webcam.json")
+csv_writer.close()
+if stream_server is not None:
+    stream_server.stop()
+if shared_ring is not None:
+    shared_ring.close()
+if delta_recording is not None:
+    delta_stats = delta_recording.close()
+    print(f"Delta recording: {delta_stats['frames']} frames, {delta_stats['bytes']} bytes -> {delta_recording_path}")
+if annotated_writer is not None:
+    video_stats = annotated_writer.close()
+    print(f"Annotated video: {video_stats['written']} frames, {video_stats['dropped']} dropped -> {annotated_video_path}")
+profiler.close()
+profiler.write_summary(profile_summary_path)
+profiler.print_summary()
+
+print(f"Saved live pose data to:\n- {csv_filename}\n- pose_data_webcam.json\n- pose_diff_5s_webcam.csv\n- pose_diff_5s_webcam.json\n- {profile_summary_path}")
 